@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:35:47 2026
+
+@author: agent
+
+Measure how fast the model runs.
+
+Time the parts of the model on artificial landscapes made with land.py
+(the pyramid by default) of several sizes, and on 'in.txt', for several
+numbers of raindrops:
+
+    startup -- Reading the landscape, finding the outlet points and
+        building the flow-direction grid, as done by project.py.
+    rain_move -- Moving Rain agents with Rain.move(), one at a time.
+    rain_move_receivers -- As rain_move, looking up the next position
+        in the flow-direction grid.
+    batch_move -- Moving all raindrops at once with RainBatch.move().
+    batch_advance -- Moving all raindrops all iterations at once with
+        RainBatch.advance().
+    batch_route -- Moving all raindrops all iterations at once a block
+        of pixels at a time with RainBatch.route(), including building
+        its tables.
+    common_network -- Finding the pixels 3 or more raindrops have moved
+        through, as in project.common_network().
+    volume -- Finding the volume of water at each outlet point from the
+        counts of raindrops kept by the batch and adding it to a results
+        store, as in project.volume().
+    flow_network -- Finding the drainage network of every pixel with
+        drainage.network().
+
+Each part is run several times and the fastest time is kept. It is then
+run once more with tracemalloc to find the peak memory it allocates.
+The speed of moving raindrops is given in drop-steps per second: the
+number of times a raindrop that was still moving was moved, divided by
+the time taken. Rain agents are moved on every iteration, so for them
+this is the number of raindrops multiplied by the number of iterations.
+Raindrops on a sink or outlet point are not counted by the other cases,
+and batch_advance and batch_route, which move raindrops many steps at
+once, are given the drop-steps batch_move takes for the same raindrops.
+
+Can be run from the command line, e.g.:
+
+    python benchmark.py --sizes 100 300 --drops 100 1000 --output bench.json
+
+and compared against an earlier run with '--baseline bench.json'.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy
+import rainframework
+import rainbatch
+import flowgrid
+import terrain
+import pathlog
+import outlets
+import drainage
+import results
+import land as landscapes
+
+
+# Modules imported by the model, timed in a new process for the startup
+# time.
+MODEL_MODULES = ['rainframework', 'rainbatch', 'flowgrid', 'terrain',
+                 'pathlog', 'outlets', 'drainage']
+
+
+
+def measure(setup, body, repeat = 3):
+    """
+    Time a part of the model and find the peak memory it allocates.
+
+    Args:
+        setup (function) -- Makes the input for 'body'. Not timed.
+        body (function) -- Part of the model to time, called with the
+            input from 'setup'. May return the amount of work done, e.g.
+            the number of drop-steps.
+        repeat (int) -- Number of times to run 'body'.
+
+    Returns:
+        seconds (float) -- Fastest time taken by 'body'.
+        peak (int) -- Peak memory allocated by 'body', in bytes.
+        work -- Value returned by 'body'.
+    """
+
+    seconds = float('inf')
+    for i in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        work = body(state)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    # Memory is measured separately, as tracemalloc slows Python down.
+    state = setup()
+    tracemalloc.start()
+    try:
+        body(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return seconds, peak, work
+
+
+
+def import_time(modules = MODEL_MODULES):
+    """
+    Time importing the model modules in a new Python process.
+
+    Args:
+        modules (list) -- Names of the modules to import.
+
+    Returns:
+        The time taken by the imports, in seconds.
+    """
+
+    code = ("import time; start = time.perf_counter(); import " +
+            ", ".join(modules) + "; print(time.perf_counter() - start)")
+    output = subprocess.run([sys.executable, '-c', code], check = True,
+                            capture_output = True, text = True,
+                            cwd = os.path.dirname(os.path.abspath(__file__)))
+
+    return float(output.stdout)
+
+
+
+def _startup_cases(land, path = None, folder = None):
+    """
+    Make the startup cases for a landscape.
+
+    Args:
+        land (array) -- Elevations.
+        path (str) -- Optional .csv file the landscape is read from.
+        folder (str) -- Directory to copy the file to, needed if 'path'
+            is given.
+
+    Returns:
+        cases (list) -- (case, setup, body) for each part.
+    """
+
+    length = len(land) - 1
+    cases = []
+
+    if path is not None:
+        # Read from a copy, so the cached binary file can be removed to
+        # time the first run.
+        copy = os.path.join(folder, os.path.basename(path))
+        shutil.copy(path, copy)
+
+        def cold():
+            for cached in (terrain.binary_path(copy),
+                           terrain.stats_path(copy)):
+                if os.path.exists(cached):
+                    os.remove(cached)
+            return copy
+
+        def warm():
+            terrain.load_land(copy)
+            return copy
+
+        def load(path):
+            land = terrain.load_land(path)
+            terrain.stats(land, length, path)
+
+        cases.append(('load_cold', cold, load))
+        cases.append(('load_warm', warm, load))
+
+    def setup():
+        return land
+
+    def startup(land):
+        area = terrain.area(land, length)
+        outlets.Outlets(area)
+        flowgrid.receivers(area, length)
+
+    cases.append(('startup', setup, startup))
+
+    def network(receivers):
+        drainage.network(receivers, length)
+
+    cases.append(('flow_network', lambda: flowgrid.receivers(land, length),
+                  network))
+
+    return cases
+
+
+
+def _drop_cases(land, num_of_drops, num_of_steps, seed = 0):
+    """
+    Make the cases moving raindrops on a landscape.
+
+    Args:
+        land (array) -- Elevations.
+        num_of_drops (int) -- Number of raindrops.
+        num_of_steps (int) -- Number of iterations.
+        seed (int) -- Seed for the placement of raindrops.
+
+    Returns:
+        cases (list) -- (case, setup, body) for each part.
+    """
+
+    length = len(land) - 1
+    area = terrain.area(land, length)
+    receivers = flowgrid.receivers(area, length)
+    receiver_list = receivers.tolist()
+    outlet_points = outlets.Outlets(area)
+    land_hash = results.grid_hash(area)
+
+    def agents(receivers = None):
+        def setup():
+            rng = random.Random(seed)
+            all_drops = pathlog.VisitRaster(length)
+            raindrops = []
+            for i in range(num_of_drops):
+                raindrops.append(rainframework.Rain(land, raindrops,
+                                                    all_drops, length, 0, 0,
+                                                    receivers, rng))
+            return raindrops
+        return setup
+
+    def rain_move(raindrops):
+        for j in range(num_of_steps):
+            for drop in raindrops:
+                drop.move()
+        return len(raindrops) * num_of_steps
+
+    def batch():
+        return (rainbatch.RainBatch.random(land, length, num_of_drops, seed,
+                                           receivers = receivers,
+                                           outlets = outlet_points),
+                pathlog.VisitRaster(length))
+
+    def batch_move(state):
+        batch, all_drops = state
+        steps = 0
+        drop_steps = 0
+        while steps < num_of_steps and batch.num_active > 0:
+            drop_steps = drop_steps + batch.num_active
+            batch.move(all_drops)
+            steps = steps + 1
+        return drop_steps
+
+    # Drop-steps of batch_move, found once, for the cases moving the same
+    # raindrops many steps at once.
+    moves = []
+
+    def jumping():
+        if not moves:
+            moves.append(batch_move(batch()))
+        return batch() + (moves[0],)
+
+    def batch_advance(state):
+        batch, all_drops, drop_steps = state
+        batch.advance(num_of_steps, all_drops)
+        return drop_steps
+
+    def batch_route(state):
+        # Routing does not count the moves onto each pixel.
+        state[0].route(num_of_steps)
+        return state[2]
+
+    def moved():
+        state = batch()
+        batch_move(state)
+        return state
+
+    def common_network(state):
+        state[1].coords(3)
+
+    def stored():
+        # The store writes to a temporary directory, removed when the
+        # state is no longer used.
+        batch, all_drops = moved()
+        folder = tempfile.TemporaryDirectory()
+        return batch, results.ResultStore(folder.name), folder
+
+    def volume(state):
+        batch, store = state[0], state[1]
+        num_at_outlet = int(batch.outlet_counts.sum())
+        total_vol = outlets.drop_volume(0.3) * num_at_outlet
+        vols = outlets.drop_volume(0.3) * batch.outlet_counts
+        store.add(seed, land_hash, num_of_steps, num_of_drops, 0.3,
+                  total_vol, num_at_outlet, vols)
+        store.flush()
+
+    return [('rain_move', agents(), rain_move),
+            ('rain_move_receivers', agents(receiver_list), rain_move),
+            ('batch_move', batch, batch_move),
+            ('batch_advance', jumping, batch_advance),
+            ('batch_route', jumping, batch_route),
+            ('common_network', moved, common_network),
+            ('volume', stored, volume)]
+
+
+
+def run(sizes, drops, num_of_steps = 100, land_path = 'in.txt',
+        repeat = 3, max_agent_steps = 10 ** 6, kinds = ('pyramid',)):
+    """
+    Run the benchmarks.
+
+    Args:
+        sizes (list) -- Sizes of the artificial landscapes.
+        drops (list) -- Numbers of raindrops.
+        num_of_steps (int) -- Number of iterations.
+        land_path (str) -- Optional .csv file with a landscape to include.
+        repeat (int) -- Number of times each part is run.
+        max_agent_steps (int) -- Largest number of drop-steps to run with
+            Rain agents, which are much slower than the other cases.
+        kinds (tuple) -- Artificial landscapes to use, keys of
+            land.TERRAINS.
+
+    Returns:
+        report (dict) -- Details of the machine and the results of each
+            case.
+    """
+
+    # The artificial landscapes are square, so they can be indexed
+    # land[x][y] as well as land[y][x]. Seeded landscapes use seed 0.
+    terrains = [(kind, landscapes.generate(kind, size, size).astype(float),
+                 None) for kind in kinds for size in sizes]
+    if land_path is not None and os.path.exists(land_path):
+        terrains.append((os.path.basename(land_path),
+                         numpy.asarray(terrain.load_land(land_path)),
+                         land_path))
+
+    measured = [{'case': 'import', 'terrain': None, 'size': None,
+                 'drops': None, 'seconds': import_time()}]
+
+    def add(case, name, land, num_of_drops, setup, body):
+        seconds, peak, drop_steps = measure(setup, body, repeat)
+        result = {'case': case, 'terrain': name, 'size': len(land),
+                  'drops': num_of_drops, 'seconds': seconds,
+                  'peak_bytes': peak}
+        if drop_steps is not None:
+            result['steps'] = num_of_steps
+            result['drop_steps'] = drop_steps
+            result['drop_steps_per_sec'] = drop_steps / max(seconds, 1e-9)
+        measured.append(result)
+        print(_describe(result))
+
+    for name, land, path in terrains:
+        with tempfile.TemporaryDirectory() as folder:
+            for case, setup, body in _startup_cases(land, path, folder):
+                add(case, name, land, None, setup, body)
+        for num_of_drops in drops:
+            for case, setup, body in _drop_cases(land, num_of_drops,
+                                                 num_of_steps):
+                if (case.startswith('rain_move') and
+                        num_of_drops * num_of_steps > max_agent_steps):
+                    continue
+                add(case, name, land, num_of_drops, setup, body)
+
+    return {'created': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': numpy.__version__, 'platform': platform.platform(),
+            'processor': platform.processor(), 'steps': num_of_steps,
+            'repeat': repeat, 'results': measured}
+
+
+
+def _key(result):
+    """
+    Identify a result, so it can be matched with a baseline.
+    """
+
+    return (result['case'], result['terrain'], result['size'],
+            result['drops'])
+
+
+
+def _describe(result):
+    """
+    Describe a result in one line.
+    """
+
+    text = result['case']
+    if result['terrain'] is not None:
+        text = text + " " + result['terrain'] + " " + str(result['size'])
+    if result['drops'] is not None:
+        text = text + " drops=" + str(result['drops'])
+    text = text + ": " + "%.4f" % result['seconds'] + " s"
+    if 'drop_steps_per_sec' in result:
+        text = text + ", " + "%.3g" % result['drop_steps_per_sec'] + \
+            " drop-steps/s"
+    if 'peak_bytes' in result:
+        text = text + ", peak " + "%.1f" % (result['peak_bytes'] / 2 ** 20) + \
+            " MiB"
+
+    return text
+
+
+
+def compare(report, baseline, tolerance = 0.1, min_seconds = 0.005):
+    """
+    Compare the results of a run against an earlier run.
+
+    Args:
+        report (dict) -- Results from run().
+        baseline (dict) -- Earlier results from run().
+        tolerance (float) -- Fraction by which a case may be slower than
+            the baseline before it is reported as slower.
+        min_seconds (float) -- Cases faster than this are never reported
+            as slower, as their times vary too much to compare.
+
+    Returns:
+        changes (list) -- (result, ratio of the time taken to the
+            baseline time) for each case in both runs.
+        slower (list) -- The changes slower than the tolerance.
+    """
+
+    times = {_key(result): result['seconds']
+             for result in baseline['results']}
+
+    changes = [(result, result['seconds'] / max(times[_key(result)], 1e-9))
+               for result in report['results'] if _key(result) in times]
+    slower = [(result, ratio) for result, ratio in changes
+              if ratio > 1 + tolerance and result['seconds'] > min_seconds]
+
+    return changes, slower
+
+
+
+def main(argv = None):
+    """
+    Run the benchmarks from the command line.
+
+    Args:
+        argv (list) -- Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        1 if any case was slower than the baseline, otherwise 0.
+    """
+
+    parser = argparse.ArgumentParser(description = "Measure how fast the "
+                                     "raindrop model runs.")
+    parser.add_argument('--sizes', type = int, nargs = '+',
+                        default = [100, 300, 1000],
+                        help = "Sizes of the artificial landscapes.")
+    parser.add_argument('--terrains', nargs = '+', default = ['pyramid'],
+                        choices = list(landscapes.TERRAINS),
+                        help = "Artificial landscapes to use.")
+    parser.add_argument('--drops', type = int, nargs = '+',
+                        default = [100, 1000, 10000],
+                        help = "Numbers of raindrops.")
+    parser.add_argument('--steps', type = int, default = 100,
+                        help = "Number of iterations.")
+    parser.add_argument('--land', default = 'in.txt',
+                        help = "File containing environment data to "
+                        "include (.csv). Use '' for artificial landscapes "
+                        "only.")
+    parser.add_argument('--repeat', type = int, default = 3,
+                        help = "Number of times each case is run.")
+    parser.add_argument('--output', default = None,
+                        help = "Save the results to this .json file.")
+    parser.add_argument('--baseline', default = None,
+                        help = "Compare against results in this .json "
+                        "file.")
+    parser.add_argument('--tolerance', type = float, default = 0.1,
+                        help = "Fraction slower than the baseline allowed.")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.drops, args.steps, args.land or None,
+                 args.repeat, kinds = args.terrains)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent = 1)
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    changes, slower = compare(report, baseline, args.tolerance)
+    print("Compared with " + args.baseline + ":")
+    for result, ratio in changes:
+        print("  " + _describe(result) + " (" + "%.2f" % ratio +
+              " x baseline)")
+    if slower:
+        print(str(len(slower)) + " case(s) slower than the baseline.")
+        return 1
+
+    return 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:51:48 2026
+
+@author: agent
+
+Save the state of a model run so it can be carried on later.
+
+A checkpoint holds everything needed to carry on a run exactly where it
+was left: the coordinates of the raindrops, which raindrops are still
+moving, the number of raindrops at each outlet point, the number of
+iterations run, the state of the random number generator and the number
+of times raindrops have moved onto each pixel. It is a single NumPy
+(.npz) file, written to a temporary file and then renamed, so a
+checkpoint is either complete or not there at all.
+
+Checkpoints are written by a Checkpointer in a thread of its own. The
+model only copies its arrays, which is quick, and carries on moving the
+raindrops while the copy is written to disk. If a checkpoint is still
+waiting to be written when the next one is made, the older one is
+thrown away, so the model never waits for the disk.
+
+simulate.py and project.py draw from their random number generator only
+to place the raindrops, before the first checkpoint, so its saved state
+does not change the results of a resumed run. It is kept so that runs
+drawing random numbers as they go can also be carried on exactly.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import zipfile
+import numpy
+
+
+
+def _rng_state(rng):
+    """
+    Get the state of a random number generator as text.
+
+    Args:
+        rng -- random.Random or numpy.random.Generator, or None.
+
+    Returns:
+        state (str) -- JSON text, or an empty string if 'rng' is None.
+    """
+
+    if rng is None:
+        return ''
+    if isinstance(rng, numpy.random.Generator):
+        return json.dumps({'kind': 'numpy',
+                           'state': rng.bit_generator.state})
+
+    return json.dumps({'kind': 'random', 'state': rng.getstate()})
+
+
+
+def _set_rng_state(rng, text):
+    """
+    Set the state of a random number generator from text.
+
+    Args:
+        rng -- random.Random or numpy.random.Generator.
+        text (str) -- JSON text from _rng_state().
+    """
+
+    state = json.loads(text)
+    if state['kind'] == 'numpy':
+        if not isinstance(rng, numpy.random.Generator):
+            raise ValueError("Checkpoint holds the state of a "
+                             "numpy.random.Generator.")
+        rng.bit_generator.state = state['state']
+    else:
+        if not isinstance(rng, random.Random):
+            raise ValueError("Checkpoint holds the state of a "
+                             "random.Random.")
+        version, internal, gauss = state['state']
+        rng.setstate((version, tuple(internal), gauss))
+
+
+
+def snapshot(batch, step, rng = None, visits = None, **values):
+    """
+    Copy the state of a model run.
+
+    Args:
+        batch (RainBatch) -- Raindrops of the run.
+        step (int) -- Number of iterations run.
+        rng -- Optional random.Random or numpy.random.Generator used by
+            the run.
+        visits (VisitRaster) -- Optional counts of the raindrops moving
+            onto each pixel. For a pathlog.BinaryPathLog, the log is
+            written to disk and the number of moves in it is saved, so
+            moves recorded after the checkpoint can be thrown away when
+            the run is carried on. A NullPathLog is not saved.
+        values -- Any other numbers or text to save, e.g. a hash of the
+            landscape.
+
+    Returns:
+        state (dict) -- Arrays to save, see save().
+    """
+
+    # Checked here, so a value that cannot be saved is found straight
+    # away rather than in the writing thread.
+    for name, value in values.items():
+        if not isinstance(value, (int, float, str, numpy.number,
+                                  numpy.bool_)):
+            raise ValueError("Checkpoint value '" + name + "' must be a "
+                             "number or text, not " + repr(value) + ".")
+
+    state = {'length': batch.length, 'step': step,
+             'x': batch.x.copy(), 'y': batch.y.copy(),
+             'active': batch.active.copy(), 'rng': _rng_state(rng)}
+    if batch.outlets is not None:
+        state['outlet_counts'] = batch.outlet_counts.copy()
+    if getattr(visits, 'counts', None) is not None:
+        state['visits'] = visits.counts.copy()
+    elif hasattr(visits, 'truncate'):
+        visits.flush()
+        state['log_moves'] = visits.num_moves
+    for name, value in values.items():
+        state['value_' + name] = value
+
+    return state
+
+
+
+def save(path, batch, step, rng = None, visits = None, **values):
+    """
+    Save the state of a model run.
+
+    Args:
+        path (str) -- Name of the .npz file.
+        batch (RainBatch) -- Raindrops of the run.
+        step (int) -- Number of iterations run.
+        rng -- Optional random number generator used by the run.
+        visits (VisitRaster) -- Optional counts of the raindrops moving
+            onto each pixel.
+        values -- Any other numbers to save.
+    """
+
+    write(path, snapshot(batch, step, rng, visits, **values))
+
+
+
+def write(path, state):
+    """
+    Write a copy of the state of a model run to a file.
+
+    Args:
+        path (str) -- Name of the .npz file.
+        state (dict) -- State from snapshot().
+    """
+
+    # The same layout as numpy.savez_compressed(), so the file can be
+    # read with numpy.load(), but with the fastest compression: on large
+    # landscapes this is several times quicker, for a slightly larger
+    # file.
+    try:
+        with zipfile.ZipFile(path + '.tmp', 'w', zipfile.ZIP_DEFLATED,
+                             compresslevel = 1) as zf:
+            for name, value in state.items():
+                with zf.open(name + '.npy', 'w', force_zip64 = True) as f:
+                    numpy.lib.format.write_array(f, numpy.asanyarray(value),
+                                                 allow_pickle = False)
+    except BaseException:
+        # Never leave a partial file behind.
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+        raise
+    os.replace(path + '.tmp', path)
+
+
+
+def load(path):
+    """
+    Read the state of a model run.
+
+    Args:
+        path (str) -- Name of the .npz file.
+
+    Returns:
+        state (dict) -- Dictionary containing:
+            length (int) -- Size of the environment used.
+            step (int) -- Number of iterations run.
+            x, y (array) -- Raindrop coordinates.
+            active (array) -- Indices of the raindrops still moving.
+            outlet_counts (array) -- Number of raindrops at each outlet
+                point, if the run had outlet points.
+            visits (array) -- Number of times a raindrop moved onto each
+                pixel, if saved.
+            log_moves (int) -- Number of moves in the path log, if one
+                was used.
+            rng (str) -- State of the random number generator.
+            values (dict) -- Other numbers saved.
+    """
+
+    with numpy.load(path) as data:
+        state = {'length': int(data['length']), 'step': int(data['step']),
+                 'x': data['x'], 'y': data['y'], 'active': data['active'],
+                 'rng': str(data['rng']), 'values': {}}
+        for name in ('outlet_counts', 'visits'):
+            if name in data.files:
+                state[name] = data[name]
+        if 'log_moves' in data.files:
+            state['log_moves'] = int(data['log_moves'])
+        for name in data.files:
+            if name.startswith('value_'):
+                state['values'][name[6:]] = data[name].item()
+
+    return state
+
+
+
+def restore(state, batch, rng = None, visits = None):
+    """
+    Carry on a model run from a saved state.
+
+    Args:
+        state (dict) -- State from load().
+        batch (RainBatch) -- Raindrops to set up, on the same landscape
+            and with the same number of raindrops as the saved run.
+        rng -- Optional random number generator to set to the saved
+            state.
+        visits (VisitRaster) -- Optional counts to set to the saved
+            counts, or a pathlog.BinaryPathLog opened to add moves to,
+            which is cut back to the moves recorded when the state was
+            saved.
+
+    Returns:
+        step (int) -- Number of iterations run before the state was
+            saved.
+    """
+
+    if state['length'] != batch.length or len(state['x']) != len(batch):
+        raise ValueError("Checkpoint was saved from a run with length " +
+                         str(state['length']) + " and " +
+                         str(len(state['x'])) + " raindrops, not " +
+                         str(batch.length) + " and " + str(len(batch)) +
+                         ".")
+
+    batch.x[:] = state['x']
+    batch.y[:] = state['y']
+    batch.active = numpy.array(state['active'], dtype = numpy.intp)
+    if batch.outlets is not None and 'outlet_counts' in state:
+        batch.outlet_counts[:] = state['outlet_counts']
+
+    if rng is not None and state['rng']:
+        _set_rng_state(rng, state['rng'])
+
+    if getattr(visits, 'counts', None) is not None and 'visits' in state:
+        visits.counts[...] = state['visits']
+    elif hasattr(visits, 'truncate') and 'log_moves' in state:
+        visits.truncate(state['log_moves'])
+
+    return state['step']
+
+
+
+class Checkpointer():
+    """
+    Set up and provide methods for writing checkpoints in the background.
+
+    __init__ -- Set up the checkpointer and start the writing thread.
+    update -- Make a checkpoint every so many iterations.
+    save -- Make a checkpoint.
+    close -- Wait for the last checkpoint to be written.
+    """
+
+    def __init__(self, path, every = 100):
+        """
+        Set up the checkpointer and start the writing thread.
+
+        Args:
+            path (str) -- Name of the .npz file. Each checkpoint replaces
+                the one before.
+            every (int) -- Number of iterations between checkpoints.
+        """
+
+        if every < 1:
+            raise ValueError("Checkpoints must be at least 1 iteration "
+                             "apart.")
+
+        self.path = path
+        self.every = every
+
+        # Number of checkpoints written, and the error from the writing
+        # thread, if any.
+        self.written = 0
+        self.error = None
+
+        # Holds at most one checkpoint waiting to be written.
+        self._pending = queue.Queue(maxsize = 1)
+        self._thread = threading.Thread(target = self._write_all,
+                                        daemon = True)
+        self._thread.start()
+
+
+    def _write_all(self):
+        """
+        Write checkpoints as they are made, until close() is called.
+        """
+
+        while True:
+            state = self._pending.get()
+            if state is None:
+                return
+            try:
+                write(self.path, state)
+                self.written = self.written + 1
+            except Exception as e:
+                # Kept to be raised in the model's thread. The thread
+                # carries on, so close() can still stop it.
+                self.error = e
+
+
+    def update(self, batch, step, rng = None, visits = None, **values):
+        """
+        Make a checkpoint every so many iterations.
+
+        Args:
+            batch (RainBatch) -- Raindrops of the run.
+            step (int) -- Number of iterations run.
+            rng, visits, values -- As for save().
+
+        Returns:
+            saved (bool) -- Whether a checkpoint was made.
+        """
+
+        if step % self.every != 0:
+            return False
+
+        self.save(batch, step, rng, visits, **values)
+
+        return True
+
+
+    def save(self, batch, step, rng = None, visits = None, **values):
+        """
+        Make a checkpoint.
+
+        The state is copied straight away and written by the writing
+        thread. If a checkpoint is still waiting to be written, it is
+        thrown away.
+
+        Args:
+            batch (RainBatch) -- Raindrops of the run.
+            step (int) -- Number of iterations run.
+            rng -- Optional random number generator used by the run.
+            visits (VisitRaster) -- Optional counts of the raindrops
+                moving onto each pixel.
+            values -- Any other numbers to save.
+        """
+
+        if self.error is not None:
+            raise self.error
+
+        state = snapshot(batch, step, rng, visits, **values)
+        try:
+            self._pending.put_nowait(state)
+        except queue.Full:
+            try:
+                self._pending.get_nowait() # Throw away the older state.
+            except queue.Empty:
+                pass
+            self._pending.put_nowait(state)
+
+
+    def close(self):
+        """
+        Wait for the last checkpoint to be written.
+
+        Raises the error from the writing thread, if there was one,
+        rather than waiting for a thread that has stopped.
+        """
+
+        while self._thread.is_alive():
+            try:
+                self._pending.put(None, timeout = 0.1)
+                break
+            except queue.Full:
+                pass
+        self._thread.join()
+
+        if self.error is not None:
+            raise self.error
+        if self._pending.qsize() > 0:
+            raise RuntimeError("The thread writing checkpoints to " +
+                               self.path + " has stopped.")
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:24:18 2026
+
+@author: agent
+
+Find the drainage network and watersheds of a landscape directly.
+
+Rather than releasing random raindrops and tracing their paths, follow
+the flow-direction grid from flowgrid.receivers() for every pixel at
+once. This is the same as releasing one raindrop on every pixel and
+moving it with Rain.move() until it stops, but takes a single pass over
+the landscape.
+
+Pixels are processed in topological order: a pixel is only passed on to
+its receiver once every pixel draining into it has been processed. Flow
+ends at sinks, which receive themselves, and at groups of pixels of
+equal elevation that raindrops move around forever. Both are called
+'terminals' here.
+"""
+
+import numpy
+import pathlog
+
+
+
+def _order(rec):
+    """
+    Put the pixels of a flow-direction grid in topological order.
+
+    Args:
+        rec (array) -- Flat array of receiver indices.
+
+    Returns:
+        fronts (list) -- Arrays of pixels. Every pixel draining into a
+            pixel appears in an earlier array than it.
+        terminal (array) -- True for pixels on a terminal, which are
+            not in 'fronts'.
+    """
+
+    cells = numpy.arange(len(rec))
+    moves = rec != cells
+
+    # Number of neighbours draining into each pixel.
+    inflow = numpy.bincount(rec[moves], minlength = len(rec))
+
+    fronts = []
+    front = cells[(inflow == 0) & moves]
+    while front.size:
+        fronts.append(front)
+        targets = rec[front]
+        numpy.subtract.at(inflow, targets, 1)
+        targets = numpy.unique(targets)
+        front = targets[(inflow[targets] == 0) & moves[targets]]
+
+    # Pixels that were never reached drain into themselves, either
+    # directly or around a loop.
+    terminal = numpy.ones(len(rec), dtype = bool)
+    for front in fronts:
+        terminal[front] = False
+
+    return fronts, terminal
+
+
+
+def _terminal_ids(rec, terminal):
+    """
+    Give all pixels on the same terminal the same number.
+
+    Args:
+        rec (array) -- Flat array of receiver indices.
+        terminal (array) -- True for pixels on a terminal.
+
+    Returns:
+        ids (array) -- Smallest pixel index on each terminal, for the
+            terminal pixels.
+        cells (array) -- Indices of the terminal pixels.
+    """
+
+    cells = numpy.nonzero(terminal)[0]
+    ids = cells.copy()
+    position = numpy.full(len(rec), -1, dtype = numpy.intp)
+    position[cells] = numpy.arange(len(cells))
+    nxt = position[rec[cells]]
+
+    # Pass the smallest index around each loop until nothing changes.
+    while True:
+        new_ids = numpy.minimum(ids, ids[nxt])
+        if (new_ids == ids).all():
+            return ids, cells
+        ids = new_ids
+
+
+
+def loops(receivers):
+    """
+    Find the pixels that raindrops move around forever.
+
+    Args:
+        receivers (array) -- Flow-direction grid from
+            flowgrid.receivers().
+
+    Returns:
+        loop (array) -- Flat array, True for pixels on a group of pixels
+            of equal elevation that raindrops move around (a terminal
+            that is not a sink).
+    """
+
+    rec = numpy.asarray(receivers, dtype = numpy.intp)
+    terminal = _order(rec)[1]
+
+    return terminal & (rec != numpy.arange(len(rec)))
+
+
+
+def flow_accumulation(receivers, length, weights = None):
+    """
+    Count the pixels that drain through each pixel.
+
+    Each pixel starts with its own rainfall (1, or its weight) and
+    passes everything it has received on to its receiver. Every pixel
+    on a terminal ends up with the total that drains into the terminal.
+
+    Args:
+        receivers (array) -- Flow-direction grid from
+            flowgrid.receivers().
+        length (int) -- Size of the environment to be used.
+        weights (array) -- Optional rainfall on each pixel, indexed
+            [x, y] like 'land'.
+
+    Returns:
+        acc (array) -- Flow accumulation, indexed [x, y] like 'land'.
+    """
+
+    rec = numpy.asarray(receivers, dtype = numpy.intp)
+    n = length + 1
+
+    if weights is None:
+        acc = numpy.ones(len(rec))
+    else:
+        acc = numpy.array(weights, dtype = float)[:n, :n].ravel()
+
+    fronts, terminal = _order(rec)
+    for front in fronts:
+        numpy.add.at(acc, rec[front], acc[front])
+
+    ids, cells = _terminal_ids(rec, terminal)
+    totals = numpy.bincount(ids, weights = acc[cells], minlength = len(rec))
+    acc[cells] = totals[ids]
+
+    return acc.reshape(n, n)
+
+
+
+def watersheds(receivers, length):
+    """
+    Label each pixel with the watershed it drains into.
+
+    Args:
+        receivers (array) -- Flow-direction grid from
+            flowgrid.receivers().
+        length (int) -- Size of the environment to be used.
+
+    Returns:
+        labels (array) -- Watershed number (0, 1, 2...) of each pixel,
+            indexed [x, y] like 'land'.
+    """
+
+    rec = numpy.asarray(receivers, dtype = numpy.intp)
+    n = length + 1
+
+    fronts, terminal = _order(rec)
+    ids, cells = _terminal_ids(rec, terminal)
+
+    labels = numpy.empty(len(rec), dtype = numpy.intp)
+    labels[cells] = ids
+
+    # Work back upslope, giving each pixel the label of its receiver.
+    for front in reversed(fronts):
+        labels[front] = labels[rec[front]]
+
+    # Number the watersheds from 0.
+    labels = numpy.unique(labels, return_inverse = True)[1]
+
+    return labels.reshape(n, n)
+
+
+
+def network(receivers, length):
+    """
+    Get the drainage network as counts of raindrops moving onto pixels.
+
+    Gives the counts that would be recorded if one raindrop were placed
+    on every pixel and moved until it reached a terminal, so the result
+    can be plotted in the same way as the paths of the raindrops in a
+    model run. Pixels on a terminal are given the number of raindrops
+    that reach the terminal.
+
+    Args:
+        receivers (array) -- Flow-direction grid from
+            flowgrid.receivers().
+        length (int) -- Size of the environment to be used.
+
+    Returns:
+        raster (pathlog.VisitRaster) -- Counts for each pixel.
+    """
+
+    # A raindrop's own pixel is not counted, as it never moves onto it.
+    raster = pathlog.VisitRaster(length)
+    raster.counts[:] = flow_accumulation(receivers, length) - 1
+
+    return raster
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:21:53 2026
+
+@author: agent
+
+Run many realisations of the raindrop model in parallel.
+
+Spread model runs with different seeds, numbers of raindrops and radii
+over a pool of processes, and collect the volume of water that reached
+an outlet point in each run into a single table, written to a results
+store (see results.py). The landscape and its flow-direction grid are
+placed in shared memory once, so each process reads them directly
+rather than being sent a copy with every run.
+
+Can be run from the command line, e.g.:
+
+    python ensemble.py in.txt --runs 100 --drops 100 1000 --radius 0.3
+
+Returns:
+    rows (list) -- For each run: total volume of water that has reached
+        an outlet point, number of raindrops contributing to this total,
+        total number of raindrops, radius of the raindrops, seed, number
+        of iterations run and volume of water at each outlet point. These
+        are the same values added to the results store by project.py.
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import multiprocessing.shared_memory
+import numpy
+import flowgrid
+import results
+import simulate
+import terrain
+
+
+# Views of the shared landscape and flow-direction grid, set up in each
+# worker process by _attach().
+_shared = {}
+
+
+
+def _share(array):
+    """
+    Copy an array into a new block of shared memory.
+
+    Args:
+        array (array) -- Array to share.
+
+    Returns:
+        shm (SharedMemory) -- Block of shared memory holding the array.
+        spec (tuple) -- Name, shape and data type needed to attach to it.
+    """
+
+    shm = multiprocessing.shared_memory.SharedMemory(create = True,
+                                                     size = array.nbytes)
+    view = numpy.ndarray(array.shape, dtype = array.dtype, buffer = shm.buf)
+    view[:] = array
+
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+
+def _attach(land_spec, receiver_spec):
+    """
+    Attach a worker process to the shared landscape.
+
+    Args:
+        land_spec (tuple) -- Name, shape and data type of the landscape.
+        receiver_spec (tuple) -- Name, shape and data type of the
+            flow-direction grid.
+    """
+
+    for key, (name, shape, dtype) in (('land', land_spec),
+                                      ('receivers', receiver_spec)):
+        shm = multiprocessing.shared_memory.SharedMemory(name = name)
+        view = numpy.ndarray(shape, dtype = dtype, buffer = shm.buf)
+        view.flags.writeable = False
+        # Keep a reference to the block so it is not closed.
+        _shared[key + '_shm'] = shm
+        _shared[key] = view
+
+
+
+def _run(params):
+    """
+    Run the model once in a worker process.
+
+    Args:
+        params (tuple) -- Number of raindrops, number of iterations,
+            radius and seed.
+
+    Returns:
+        row (list) -- Total volume, number of raindrops at an outlet
+            point, number of raindrops, radius, seed, number of
+            iterations run and volume at each outlet point.
+    """
+
+    num_of_drops, num_of_steps, radius, seed = params
+    land = _shared['land']
+    run = simulate.simulate(land, num_of_drops, num_of_steps, radius, seed,
+                            len(land) - 1, _shared['receivers'])
+
+    return [run['total_vol'], run['outlet_drops'], num_of_drops, radius,
+            seed, run['steps'], run['outlet_vols']]
+
+
+
+def run_ensemble(land, length, runs, processes = None):
+    """
+    Run the model once for each set of parameters, in parallel.
+
+    Args:
+        land (list) -- Environment coordinate list or array.
+        length (int) -- Size of the environment to be used.
+        runs (list) -- (num_of_drops, num_of_steps, radius, seed) for
+            each run.
+        processes (int) -- Number of processes. Defaults to the number
+            of CPUs.
+
+    Returns:
+        rows (list) -- Total volume, number of raindrops at an outlet
+            point, number of raindrops, radius, seed, number of iterations
+            run and volume at each outlet point for each run, in the same
+            order as 'runs'.
+    """
+
+    area = terrain.area(land, length)
+    land_shm, land_spec = _share(area)
+    receiver_shm, receiver_spec = _share(flowgrid.receivers(area, length))
+
+    try:
+        with multiprocessing.Pool(processes, initializer = _attach,
+                                  initargs = (land_spec,
+                                              receiver_spec)) as pool:
+            rows = pool.map(_run, runs)
+    finally:
+        for shm in (land_shm, receiver_shm):
+            shm.close()
+            shm.unlink()
+
+    return rows
+
+
+
+def write_rows(rows, grid, path = 'results'):
+    """
+    Add the results of an ensemble to a results store.
+
+    All the runs are written to the store at once, in a single file.
+
+    Args:
+        rows (list) -- Rows returned by run_ensemble().
+        grid (str) -- Hash of the landscape, from results.grid_hash().
+        path (str) -- Directory of the results store.
+
+    Returns:
+        name (str) -- Name of the file written.
+    """
+
+    store = results.ResultStore(path)
+    for total_vol, outlet_drops, num_of_drops, radius, seed, steps, vols \
+            in rows:
+        store.add(seed, grid, steps, num_of_drops, radius, total_vol,
+                  outlet_drops, vols)
+
+    return store.flush()
+
+
+
+def main(argv = None):
+    """
+    Run an ensemble from the command line.
+
+    A run is made for every combination of number of raindrops and
+    radius given, 'runs' times each with seeds counting up from 'seed'.
+
+    Args:
+        argv (list) -- Command line arguments. Defaults to sys.argv.
+    """
+
+    parser = argparse.ArgumentParser(description = "Run many realisations "
+                                     "of the raindrop model in parallel.")
+    parser.add_argument('land', help = "File containing environment data "
+                        "(.csv or .npy).")
+    parser.add_argument('--runs', type = int, default = 10,
+                        help = "Number of runs for each set of parameters.")
+    parser.add_argument('--drops', type = int, nargs = '+', default = [100],
+                        help = "Number(s) of raindrops.")
+    parser.add_argument('--steps', type = int, default = 100,
+                        help = "Number of iterations.")
+    parser.add_argument('--radius', type = float, nargs = '+',
+                        default = [0.3], help = "Radius (radii) of the "
+                        "raindrops.")
+    parser.add_argument('--seed', type = int, default = 0,
+                        help = "Seed of the first run.")
+    parser.add_argument('--length', type = int, default = None,
+                        help = "Size of the environment to be used.")
+    parser.add_argument('--processes', type = int, default = None,
+                        help = "Number of processes.")
+    parser.add_argument('--output', default = 'results',
+                        help = "Add the results to the results store in "
+                        "this directory.")
+    args = parser.parse_args(argv)
+
+    land = terrain.load_land(args.land)
+    length = len(land) - 1 if args.length is None else args.length
+
+    seeds = itertools.count(args.seed)
+    runs = [(drops, args.steps, radius, next(seeds))
+            for drops, radius in itertools.product(args.drops, args.radius)
+            for i in range(args.runs)]
+
+    rows = run_ensemble(land, length, runs, args.processes)
+    write_rows(rows, results.grid_hash(terrain.area(land, length)),
+               args.output)
+
+    print("Added " + str(len(rows)) + " runs to " + args.output + ".")
+
+
+
+if __name__ == '__main__':
+    main()
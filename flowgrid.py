@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:18:11 2026
+
+@author: agent
+
+Build a flow-direction grid for the landscape.
+
+For each pixel of the environment, find the pixel a raindrop sitting on
+it would move to next. The landscape does not change during a model run,
+so this only needs to be done once. Raindrops can then be moved by
+looking up their next position in the grid rather than assessing their
+neighbours on every step.
+
+The grid is stored as a flat array of 'receivers': the receiver of pixel
+(x, y) is found at index x * (length + 1) + y and holds the index of the
+pixel the raindrop moves to. Pixels that are lower than all of their
+neighbours (sinks) receive themselves.
+
+JumpTable builds on this grid to move raindrops many steps at once.
+"""
+
+import numpy
+import drainage
+import terrain
+
+
+# Offsets of the 8 neighbouring pixels, in the same order as the
+# 'neighbours' list in Rain.move(). The order matters for tie-breaking.
+OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0),
+           (1, 1)]
+
+
+
+def directions(padded):
+    """
+    Find the direction a raindrop on each pixel would move in.
+
+    Use the same rules as Rain.move(): a raindrop moves to its lowest
+    neighbour if that neighbour is lower than or equal in elevation to
+    its current position, and if more than one neighbour shares the
+    lowest elevation the last one, in row-by-row order, is chosen.
+
+    Args:
+        padded (array) -- Elevations with a border of one pixel on each
+            side. Pixels outside the environment should be given an
+            infinite elevation so they are never chosen.
+
+    Returns:
+        dx (array) -- Change in x-coordinate (-1, 0 or 1) for each pixel
+            inside the border.
+        dy (array) -- Change in y-coordinate (-1, 0 or 1) for each pixel
+            inside the border.
+    """
+
+    rows = padded.shape[0] - 2
+    cols = padded.shape[1] - 2
+    centre = padded[1:rows + 1, 1:cols + 1]
+
+    best = numpy.full((rows, cols), numpy.inf)
+    best_dx = numpy.zeros((rows, cols), dtype = numpy.intp)
+    best_dy = numpy.zeros((rows, cols), dtype = numpy.intp)
+
+    # Using '<=' keeps the last of any equal neighbours, as the loop in
+    # Rain.move() does.
+    for dx, dy in OFFSETS:
+        heights = padded[1 + dx:rows + 1 + dx, 1 + dy:cols + 1 + dy]
+        lower = heights <= best
+        best = numpy.where(lower, heights, best)
+        best_dx[lower] = dx
+        best_dy[lower] = dy
+
+    # Raindrops stay put only if all neighbours are higher.
+    stay = centre < best
+    best_dx[stay] = 0
+    best_dy[stay] = 0
+
+    return best_dx, best_dy
+
+
+
+def receivers(land, length):
+    """
+    Find the next pixel for a raindrop on every pixel of the landscape.
+
+    See directions() for the rules used.
+
+    Args:
+        land (list) -- Environment coordinate list.
+        length (int) -- Size of the environment to be used.
+
+    Returns:
+        rec (array) -- Flat array of receiver indices.
+    """
+
+    n = length + 1
+
+    # Pad the landscape with a border of infinite elevation so that
+    # pixels on the edge never choose a neighbour outside of it.
+    area = terrain.area(land, length)
+    padded = numpy.pad(area, 1, mode = 'constant',
+                       constant_values = numpy.inf)
+
+    dx, dy = directions(padded)
+    x, y = numpy.indices((n, n))
+    rec = (x + dx) * n + (y + dy)
+
+    return rec.ravel()
+
+
+
+def save(path, rec, length):
+    """
+    Save a flow-direction grid to a file for use in later model runs.
+
+    Args:
+        path (str) -- Name of the file to write (.npz).
+        rec (array) -- Flat array of receiver indices.
+        length (int) -- Size of the environment the grid was built for.
+    """
+
+    numpy.savez(path, receivers = rec, length = length)
+
+
+
+def load(path, length):
+    """
+    Load a flow-direction grid saved with save().
+
+    Args:
+        path (str) -- Name of the file to read (.npz).
+        length (int) -- Size of the environment to be used.
+
+    Returns:
+        rec (array) -- Flat array of receiver indices.
+    """
+
+    with numpy.load(path) as data:
+        if int(data['length']) != length:
+            raise ValueError("Flow-direction grid in " + str(path) +
+                             " was built for length " +
+                             str(int(data['length'])) + ", not " +
+                             str(length) + ".")
+        return data['receivers']
+
+
+
+class JumpTable():
+    """
+    Move raindrops many steps at once through a flow-direction grid.
+
+    Holds the receiver of every pixel after 1, 2, 4, 8... steps, each
+    built from the one before (pointer doubling). Moving a raindrop k
+    steps then takes one lookup for each binary digit of k, rather than
+    k lookups.
+
+    __init__ -- Build the tables.
+    advance -- Move raindrops a number of steps.
+    visits -- Count the raindrops moving onto each pixel.
+    """
+
+    def __init__(self, receivers, max_steps = None, stops = None):
+        """
+        Build the tables.
+
+        Args:
+            receivers (array) -- Flat array of receiver indices.
+            max_steps (int) -- Largest number of steps needed. If not
+                given, tables are built until every raindrop has stopped
+                or reached a group of pixels it moves around forever,
+                and 'end_steps' is set to the number of steps this takes.
+            stops (array) -- Optional flat array, True for pixels where
+                raindrops stop moving (e.g. outlet points).
+        """
+
+        rec = numpy.array(receivers, dtype = numpy.intp)
+        cells = numpy.arange(len(rec))
+        if stops is not None:
+            rec[stops] = cells[stops]
+        self.size = len(rec)
+
+        self.tables = [rec]
+        self.end_steps = None
+        if max_steps is None:
+            # Stop doubling once the last table takes every pixel to a
+            # sink or onto a loop, rather than building a table for
+            # each binary digit of the number of pixels.
+            loop = drainage.loops(rec)
+            while True:
+                last = self.tables[-1]
+                if ((rec[last] == last) | loop[last]).all():
+                    break
+                self.tables.append(last[last])
+            self.end_steps = 2 ** (len(self.tables) - 1)
+        else:
+            while 2 ** len(self.tables) <= max_steps:
+                self.tables.append(self.tables[-1][self.tables[-1]])
+
+        # Only needed by visits(), so built on its first call.
+        self._count_tables = None
+
+
+    def _counting_tables(self):
+        """
+        Get the tables used for counting, building them on first use.
+
+        For counting, raindrops that stop are sent to an extra pixel at
+        the end, so they are only counted on the step they arrive.
+
+        Returns:
+            tables (list) -- One table for each table in self.tables.
+        """
+
+        if self._count_tables is None:
+            rec = self.tables[0]
+            count_rec = numpy.append(rec, self.size)
+            count_rec[:-1][rec == numpy.arange(self.size)] = self.size
+            self._count_tables = [count_rec]
+            while len(self._count_tables) < len(self.tables):
+                last = self._count_tables[-1]
+                self._count_tables.append(last[last])
+
+        return self._count_tables
+
+
+    def advance(self, cells, steps, tables = None):
+        """
+        Move raindrops a number of steps.
+
+        Args:
+            cells (array) -- Pixel indices of the raindrops.
+            steps (int) -- Number of steps.
+            tables (list) -- Tables to use. Defaults to self.tables.
+
+        Returns:
+            cells (array) -- Pixel indices after the steps.
+        """
+
+        if tables is None:
+            tables = self.tables
+        if steps >= 2 ** len(tables):
+            raise ValueError("Jump table was built for at most " +
+                             str(2 ** len(tables) - 1) + " steps.")
+
+        i = 0
+        while steps:
+            if steps & 1:
+                cells = tables[i][cells]
+            steps = steps >> 1
+            i = i + 1
+
+        return cells
+
+
+    def _push(self, counts, steps):
+        """
+        Move counts of raindrops on each pixel a number of steps.
+
+        Args:
+            counts (array) -- Raindrops on each pixel, including the
+                extra pixel.
+            steps (int) -- Number of steps.
+
+        Returns:
+            counts (array) -- Raindrops on each pixel after the steps.
+        """
+
+        targets = self.advance(numpy.arange(len(counts)), steps,
+                               self._counting_tables())
+
+        return numpy.bincount(targets, weights = counts,
+                              minlength = len(counts))
+
+
+    def _total(self, counts, steps):
+        """
+        Add up the raindrops on each pixel after each of 1 to 'steps'
+        steps.
+
+        Args:
+            counts (array) -- Raindrops on each pixel at the start.
+            steps (int) -- Number of steps.
+
+        Returns:
+            total (array) -- Sum of the counts after each step.
+        """
+
+        if steps == 0:
+            return numpy.zeros(len(counts))
+
+        if steps % 2 == 1:
+            # Total after 1 step, plus the total of the rest starting
+            # one step later.
+            first = self._push(counts, 1)
+            return first + self._total(first, steps - 1)
+
+        # The second half is the first half moved on by half the steps.
+        half = self._total(counts, steps // 2)
+        return half + self._push(half, steps // 2)
+
+
+    def visits(self, cells, steps):
+        """
+        Count the raindrops moving onto each pixel.
+
+        Gives the same counts as moving the raindrops one step at a time
+        and recording each move (see pathlog.VisitRaster). Raindrops are
+        not counted while they stay on a sink or where they stop.
+
+        Args:
+            cells (array) -- Pixel indices of the raindrops at the start.
+            steps (int) -- Number of steps.
+
+        Returns:
+            counts (array) -- Number of moves onto each pixel.
+        """
+
+        start = numpy.bincount(cells, minlength = self.size + 1)
+        start = start.astype(float)
+
+        return numpy.rint(self._total(start, steps)[:-1]).astype(numpy.int64)
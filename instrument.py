@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:37:14 2026
+
+@author: agent
+
+Time the phases of a model run and count what the raindrops are doing.
+
+A Recorder keeps the total time spent in each phase (e.g. moving the
+raindrops or drawing a frame) and the latest value of each counter (e.g.
+the number of raindrops still moving). Each phase and counter is also
+kept as an event, so the run can be saved as a trace file in the Chrome
+trace format and opened in a profiler such as chrome://tracing or
+Perfetto.
+
+Phases are timed once per iteration or frame, not once per raindrop, so
+recording adds little to the time of a run. When instrumentation is
+switched off, NULL_RECORDER is used in place of a Recorder: its methods
+do nothing, so nothing is timed or kept.
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+
+
+
+class _Phase():
+    """
+    Time a phase of a model run, as a context manager.
+    """
+
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        """
+        Set up the phase.
+
+        Args:
+            recorder (Recorder) -- Recorder to add the time to.
+            name (str) -- Name of the phase.
+        """
+
+        self.recorder = recorder
+        self.name = name
+
+
+    def __enter__(self):
+        """
+        Start timing the phase.
+        """
+
+        self.start = time.perf_counter_ns()
+        return self
+
+
+    def __exit__(self, *exc):
+        """
+        Stop timing the phase and add the time to the recorder.
+
+        Returns:
+            False, so any error raised in the phase is not hidden.
+        """
+
+        end = time.perf_counter_ns()
+        self.recorder._add_phase(self.name, self.start, end - self.start)
+        return False
+
+
+
+class Recorder():
+    """
+    Set up and provide methods for recording phase times and counters.
+
+    Can be used from more than one thread, e.g. the model thread and the
+    GUI thread in project.py.
+
+    __init__ -- Set up the recorder.
+    phase -- Time a phase.
+    timed -- Time every call of a function as a phase.
+    count -- Set a counter.
+    totals -- Get the total time and number of calls of each phase.
+    status -- Describe the latest phase times and counters in one line.
+    trace_events -- Get the events in the Chrome trace format.
+    write_trace -- Save the events as a Chrome trace file.
+    """
+
+    enabled = True
+
+    def __init__(self, max_events = 1000000):
+        """
+        Set up the recorder.
+
+        Args:
+            max_events (int) -- Number of events kept for the trace file.
+                The oldest events are dropped once this is reached, so
+                memory use does not grow with the length of the run.
+        """
+
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._events = collections.deque(maxlen = max_events)
+
+        # Number of calls and total and latest time of each phase, in ns.
+        self._calls = collections.Counter()
+        self._total = collections.Counter()
+        self._last = {}
+
+        # Latest value of each counter.
+        self.counters = {}
+
+
+    def phase(self, name):
+        """
+        Time a phase.
+
+        Used as:
+
+            with recorder.phase('move'):
+                batch.move(all_drops)
+
+        Args:
+            name (str) -- Name of the phase.
+
+        Returns:
+            A context manager timing the code run inside it.
+        """
+
+        return _Phase(self, name)
+
+
+    def timed(self, name, function):
+        """
+        Time every call of a function as a phase.
+
+        Used for code called by other libraries, which cannot be put
+        inside a 'with recorder.phase()' block, e.g.:
+
+            canvas.blit = recorder.timed('blit', canvas.blit)
+
+        Args:
+            name (str) -- Name of the phase.
+            function (function) -- Function to time.
+
+        Returns:
+            wrapper (function) -- Calls 'function' with the same
+                arguments, timing it.
+        """
+
+        def wrapper(*args, **kwargs):
+            with _Phase(self, name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+
+    def _add_phase(self, name, start, duration):
+        """
+        Record the time taken by a phase.
+
+        Args:
+            name (str) -- Name of the phase.
+            start (int) -- Time the phase started, in ns.
+            duration (int) -- Time taken, in ns.
+        """
+
+        with self._lock:
+            self._calls[name] += 1
+            self._total[name] += duration
+            self._last[name] = duration
+            self._events.append(('X', name, threading.get_ident(),
+                                 start - self._origin, duration))
+
+
+    def count(self, **values):
+        """
+        Set counters.
+
+        Used as:
+
+            recorder.count(active = 812, stalled = 3)
+
+        Args:
+            values -- New value of each counter.
+        """
+
+        now = time.perf_counter_ns() - self._origin
+        with self._lock:
+            self.counters.update(values)
+            for name, value in values.items():
+                self._events.append(('C', name, threading.get_ident(), now,
+                                     value))
+
+
+    def totals(self):
+        """
+        Get the total time and number of calls of each phase.
+
+        Returns:
+            totals (dict) -- (number of calls, total time in seconds) for
+                each phase.
+        """
+
+        with self._lock:
+            return {name: (self._calls[name], self._total[name] / 1e9)
+                    for name in self._calls}
+
+
+    def status(self):
+        """
+        Describe the latest phase times and counters in one line.
+
+        Returns:
+            text (str) -- Counters, then the latest time of each phase in
+                milliseconds.
+        """
+
+        with self._lock:
+            parts = [name + " " + str(value)
+                     for name, value in self.counters.items()]
+            parts.extend(name + " " + "%.2f" % (ns / 1e6) + " ms"
+                         for name, ns in self._last.items())
+
+        return " | ".join(parts)
+
+
+    def trace_events(self):
+        """
+        Get the events in the Chrome trace format.
+
+        Returns:
+            events (list) -- A dictionary for each event. Times are in
+                microseconds from when the recorder was set up.
+        """
+
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+
+        trace = []
+        for kind, name, tid, start, value in events:
+            if kind == 'X':
+                trace.append({'name': name, 'ph': 'X', 'pid': pid,
+                              'tid': tid, 'ts': start / 1e3,
+                              'dur': value / 1e3})
+            else:
+                trace.append({'name': name, 'ph': 'C', 'pid': pid,
+                              'tid': tid, 'ts': start / 1e3,
+                              'args': {name: value}})
+
+        return trace
+
+
+    def write_trace(self, path):
+        """
+        Save the events as a Chrome trace file.
+
+        Args:
+            path (str) -- Name of the .json file.
+        """
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(),
+                       'displayTimeUnit': 'ms'}, f)
+
+
+
+class _NullPhase():
+    """
+    Do nothing, in place of a timed phase.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """
+        Do nothing on entering the phase.
+        """
+
+        return self
+
+
+    def __exit__(self, *exc):
+        """
+        Do nothing on leaving the phase.
+
+        Returns:
+            False, so any error raised in the phase is not hidden.
+        """
+
+        return False
+
+
+
+class NullRecorder():
+    """
+    Do not record anything.
+
+    Provides the same methods as Recorder so it can be used in its place
+    when instrumentation is switched off.
+    """
+
+    enabled = False
+    counters = {}
+
+    def phase(self, name):
+        """
+        Do not time a phase.
+
+        Returns:
+            A context manager that does nothing.
+        """
+
+        return _NULL_PHASE
+
+
+    def timed(self, name, function):
+        """
+        Do not time a function.
+
+        Returns:
+            function -- The function itself, unchanged.
+        """
+
+        return function
+
+
+    def count(self, **values):
+        """
+        Do not set counters.
+        """
+
+        pass
+
+
+    def totals(self):
+        """
+        Get no phase totals.
+
+        Returns:
+            An empty dictionary.
+        """
+
+        return {}
+
+
+    def status(self):
+        """
+        Describe nothing.
+
+        Returns:
+            An empty string.
+        """
+
+        return ""
+
+
+    def trace_events(self):
+        """
+        Get no events.
+
+        Returns:
+            An empty list.
+        """
+
+        return []
+
+
+    def write_trace(self, path):
+        """
+        Save a Chrome trace file with no events.
+
+        Args:
+            path (str) -- Name of the .json file.
+        """
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': []}, f)
+
+
+
+_NULL_PHASE = _NullPhase()
+
+# Used wherever instrumentation is switched off.
+NULL_RECORDER = NullRecorder()
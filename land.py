@@ -9,56 +9,485 @@ Credit: Code written by Andrew Evans.
 
 Create elevation data for use in the project.
 
-Provided for background on how the artificial environment 'land' was 
-created.
+Originally provided for background on how the artificial environment
+'land' was created. The pyramid is now made with NumPy for the whole
+landscape at once, rather than a pixel at a time, and other artificial
+landscapes can be made for testing the model on larger environments:
+
+    pyramid -- The original pyramid, x + y or (w - x) + (h - y).
+    tilted_plane -- A flat slope, optionally roughened with noise.
+    fractal -- Seeded fractal (value) noise, with many sinks.
+    basins -- Several seeded cone-shaped basins, each draining to its
+        own sink.
+
+Landscapes are made a block of rows at a time, and every pixel depends
+only on its own coordinates and the seed, so landscapes of any size can
+be written straight to a binary .npy file (write_npy()) or to tiles
+(write_tiles()) without holding them in memory. Nothing is run when the
+module is imported, and matplotlib is only imported to preview a
+landscape from the command line.
+
+Can be run from the command line, e.g.:
+
+    python land.py
+    python land.py fractal --size 10000 10000 --seed 1 --output big.npy
+
+With no arguments, the 100 x 100 pyramid is written to 'land.txt' as
+before.
 
 Returns:
-    land (list) -- List containing land elevation data.
-    land (.txt) -- File containing data for the land elevation.
+    land (array) -- Land elevation data, indexed land[y][x].
+    land (.txt, .npy or tile directory) -- File(s) containing the data.
 """
 
-import matplotlib
-import csv
+import argparse
+import os
+import tempfile
+import numpy
+
+
+# Number of rows made at once when writing a landscape to a file.
+BLOCK_ROWS = 1024
+
+
+
+def _pyramid(w, h):
+    """
+    Set up the original pyramid.
+
+    Args:
+        w (int) -- Width.
+        h (int) -- Height.
+
+    Returns:
+        surface (function) -- Elevation of pixels (x, y).
+    """
+
+    def surface(x, y):
+        # If (x + y) < w, then the coordinate will = x + y. If not, the
+        # coordinate will = (w - x) + (h - y).
+        return numpy.where(x + y < w, x + y, (w - x) + (h - y))
+
+    return surface
+
+
+
+def _hash(seed, octave, i, j):
+    """
+    Make a random number in [0, 1) for each lattice point.
+
+    The same lattice point always gives the same number for the same
+    seed, however the landscape is split into blocks.
+
+    Args:
+        seed (int) -- Seed.
+        octave (int) -- Octave of the noise.
+        i (array) -- Lattice rows.
+        j (array) -- Lattice columns.
+
+    Returns:
+        Random numbers, with the shape of 'i' and 'j' broadcast.
+    """
+
+    # Mix the values with the SplitMix64 finaliser. Unsigned integer
+    # arithmetic wraps around, which is what is needed here.
+    with numpy.errstate(over = 'ignore'):
+        z = (numpy.uint64(seed) * numpy.uint64(0x9E3779B97F4A7C15) +
+             numpy.uint64(octave) * numpy.uint64(0xBF58476D1CE4E5B9) +
+             i.astype(numpy.uint64) * numpy.uint64(0x94D049BB133111EB) +
+             j.astype(numpy.uint64) * numpy.uint64(0xD6E8FEB86659FD93))
+        z = (z ^ (z >> numpy.uint64(30))) * numpy.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> numpy.uint64(27))) * numpy.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> numpy.uint64(31))
+
+    return (z >> numpy.uint64(11)) * (1.0 / 2 ** 53)
+
+
+
+def _noise(x, y, seed, scale, octaves, persistence):
+    """
+    Make fractal value noise.
+
+    Random values on a square lattice are smoothly interpolated between
+    lattice points. Each octave has a lattice half the spacing of the
+    last, and is added with 'persistence' times the weight.
+
+    Args:
+        x (array) -- Pixel x-coordinates.
+        y (array) -- Pixel y-coordinates.
+        seed (int) -- Seed.
+        scale (float) -- Lattice spacing of the first octave, in pixels.
+        octaves (int) -- Number of octaves.
+        persistence (float) -- Weight of each octave relative to the
+            last.
+
+    Returns:
+        Noise in [0, 1) for each pixel.
+    """
+
+    total = 0.0
+    weight = 1.0
+    weights = 0.0
+    for octave in range(octaves):
+        spacing = scale / 2 ** octave
+        gx = x / spacing
+        gy = y / spacing
+        i = numpy.floor(gy).astype(numpy.int64)
+        j = numpy.floor(gx).astype(numpy.int64)
+        fy = gy - i
+        fx = gx - j
+        # Smooth the interpolation, so there are no creases at the
+        # lattice points.
+        fy = fy * fy * (3 - 2 * fy)
+        fx = fx * fx * (3 - 2 * fx)
+        top = (_hash(seed, octave, i, j) * (1 - fx) +
+               _hash(seed, octave, i, j + 1) * fx)
+        bottom = (_hash(seed, octave, i + 1, j) * (1 - fx) +
+                  _hash(seed, octave, i + 1, j + 1) * fx)
+        total = total + weight * (top * (1 - fy) + bottom * fy)
+        weights = weights + weight
+        weight = weight * persistence
+
+    return total / weights
+
+
+
+def _tilted_plane(w, h, slope_x = 1.0, slope_y = 1.0, noise = 0.0,
+                  seed = 0, scale = 32.0):
+    """
+    Set up a flat slope, falling towards (0, 0).
+
+    Args:
+        w (int) -- Width.
+        h (int) -- Height.
+        slope_x (float) -- Rise in elevation for each pixel in x.
+        slope_y (float) -- Rise in elevation for each pixel in y.
+        noise (float) -- Height of fractal noise added to the slope.
+        seed (int) -- Seed for the noise.
+        scale (float) -- Size of the largest features of the noise, in
+            pixels.
+
+    Returns:
+        surface (function) -- Elevation of pixels (x, y).
+    """
+
+    def surface(x, y):
+        elev = slope_x * x + slope_y * y
+        if noise:
+            elev = elev + noise * _noise(x, y, seed, scale, 4, 0.5)
+        return elev
+
+    return surface
+
+
+
+def _fractal(w, h, seed = 0, height = 100.0, scale = None, octaves = 6,
+             persistence = 0.5):
+    """
+    Set up seeded fractal noise.
+
+    Args:
+        w (int) -- Width.
+        h (int) -- Height.
+        seed (int) -- Seed.
+        height (float) -- Difference between the lowest and highest
+            possible elevation.
+        scale (float) -- Size of the largest features, in pixels.
+            Defaults to a quarter of the larger side.
+        octaves (int) -- Number of octaves of noise.
+        persistence (float) -- Weight of each octave relative to the
+            last. Lower values give smoother landscapes.
+
+    Returns:
+        surface (function) -- Elevation of pixels (x, y).
+    """
+
+    if scale is None:
+        scale = max(w, h) / 4
+
+    def surface(x, y):
+        return height * _noise(x, y, seed, scale, octaves, persistence)
+
+    return surface
+
+
+
+def _basins(w, h, num_of_basins = 4, seed = 0, slope = 1.0, depth = 20.0,
+            noise = 0.0, scale = 32.0):
+    """
+    Set up several cone-shaped basins.
+
+    The elevation of each pixel is taken from the basin whose cone is
+    lowest there, so the landscape is split into one watershed for each
+    basin, with ridges between them. The centre of each basin is a sink,
+    and the lowest centre is the outlet point.
+
+    Args:
+        w (int) -- Width.
+        h (int) -- Height.
+        num_of_basins (int) -- Number of basins.
+        seed (int) -- Seed for the position and depth of the basins.
+        slope (float) -- Rise in elevation for each pixel away from the
+            centre of a basin.
+        depth (float) -- Largest difference in depth between basins.
+        noise (float) -- Height of fractal noise added to the landscape.
+        scale (float) -- Size of the largest features of the noise, in
+            pixels.
+
+    Returns:
+        surface (function) -- Elevation of pixels (x, y).
+    """
+
+    rng = numpy.random.default_rng(seed)
+    centre_x = rng.uniform(0, w - 1, num_of_basins)
+    centre_y = rng.uniform(0, h - 1, num_of_basins)
+    floor = rng.uniform(0, depth, num_of_basins)
+
+    def surface(x, y):
+        x = numpy.asarray(x, dtype = float)
+        y = numpy.asarray(y, dtype = float)
+        elev = numpy.full(numpy.broadcast(x, y).shape, numpy.inf)
+        for cx, cy, f in zip(centre_x, centre_y, floor):
+            elev = numpy.minimum(elev, f + slope * numpy.hypot(x - cx,
+                                                               y - cy))
+        if noise:
+            elev = elev + noise * _noise(x, y, seed, scale, 4, 0.5)
+        return elev
+
+    return surface
+
+
+
+# Artificial landscapes that can be made, by name.
+TERRAINS = {'pyramid': _pyramid, 'tilted_plane': _tilted_plane,
+            'fractal': _fractal, 'basins': _basins}
+
+
+
+def blocks(kind, w, h, block_rows = BLOCK_ROWS, **params):
+    """
+    Make an artificial landscape a block of rows at a time.
+
+    Args:
+        kind (str) -- Name of the landscape, a key of TERRAINS.
+        w (int) -- Width.
+        h (int) -- Height.
+        block_rows (int) -- Number of rows in each block.
+        params -- Settings of the landscape, e.g. seed.
+
+    Yields:
+        y0 (int) -- First row of the block.
+        block (array) -- Elevations of rows y0 onwards.
+    """
+
+    if kind not in TERRAINS:
+        raise ValueError("Unknown landscape '" + str(kind) + "'; use one of " +
+                         ", ".join(TERRAINS) + ".")
+
+    surface = TERRAINS[kind](w, h, **params)
+    x = numpy.arange(w)[numpy.newaxis, :]
+
+    for y0 in range(0, h, block_rows):
+        y = numpy.arange(y0, min(y0 + block_rows, h))[:, numpy.newaxis]
+        yield y0, numpy.broadcast_to(surface(x, y), (len(y), w))
+
+
+
+def generate(kind, w = 100, h = 100, **params):
+    """
+    Make an artificial landscape.
+
+    Args:
+        kind (str) -- Name of the landscape, a key of TERRAINS.
+        w (int) -- Width.
+        h (int) -- Height.
+        params -- Settings of the landscape, e.g. seed.
+
+    Returns:
+        land (array) -- Elevations, indexed land[y][x].
+    """
+
+    return numpy.concatenate([block for y0, block in
+                              blocks(kind, w, h, **params)])
+
+
+
+def pyramid(w = 100, h = 100):
+    """
+    Make the original pyramid.
+
+    Returns:
+        land (array) -- Elevations, indexed land[y][x].
+    """
+
+    return generate('pyramid', w, h)
+
+
+
+def tilted_plane(w = 100, h = 100, **params):
+    """
+    Make a flat slope. See _tilted_plane() for the settings.
+
+    Returns:
+        land (array) -- Elevations, indexed land[y][x].
+    """
+
+    return generate('tilted_plane', w, h, **params)
+
+
+
+def fractal(w = 100, h = 100, **params):
+    """
+    Make seeded fractal noise. See _fractal() for the settings.
+
+    Returns:
+        land (array) -- Elevations, indexed land[y][x].
+    """
+
+    return generate('fractal', w, h, **params)
+
+
+
+def basins(w = 100, h = 100, **params):
+    """
+    Make several cone-shaped basins. See _basins() for the settings.
+
+    Returns:
+        land (array) -- Elevations, indexed land[y][x].
+    """
+
+    return generate('basins', w, h, **params)
+
+
+
+def write_npy(path, kind, w, h, dtype = 'float64', **params):
+    """
+    Write an artificial landscape straight to a binary .npy file.
+
+    Each block of rows is written into the memory-mapped file as it is
+    made, so landscapes larger than the available memory can be written.
+    The file can be read with terrain.load_land().
+
+    Args:
+        path (str) -- Name of the .npy file.
+        kind (str) -- Name of the landscape, a key of TERRAINS.
+        w (int) -- Width.
+        h (int) -- Height.
+        dtype (str) -- Data type used to store the elevations.
+        params -- Settings of the landscape, e.g. seed.
+
+    Returns:
+        path (str) -- Name of the .npy file written.
+    """
+
+    # Written under a temporary name and then renamed, as in
+    # terrain.convert().
+    tmp_path = path + '.tmp'
+    out = numpy.lib.format.open_memmap(tmp_path, mode = 'w+', dtype = dtype,
+                                       shape = (h, w))
+    for y0, block in blocks(kind, w, h, **params):
+        out[y0:y0 + len(block)] = block
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
+
+    return path
+
+
+
+def write_tiles(path, kind, w, h, tile_size = 1024, halo = 1, **params):
+    """
+    Write an artificial landscape straight to tiles.
+
+    The landscape is written to a temporary .npy file first and split
+    into tiles from there, so it is never held in memory.
+
+    Args:
+        path (str) -- Tile directory, as used by tiles.TiledLand.
+        kind (str) -- Name of the landscape, a key of TERRAINS.
+        w (int) -- Width.
+        h (int) -- Height.
+        tile_size (int) -- Number of pixels along each side of a tile.
+        halo (int) -- Number of pixels around each tile saved with it.
+        params -- Settings of the landscape, e.g. seed.
+    """
+
+    import tiles
+
+    with tempfile.TemporaryDirectory() as folder:
+        npy_path = write_npy(os.path.join(folder, 'land.npy'), kind, w, h,
+                             **params)
+        tiles.write_tiles(numpy.load(npy_path, mmap_mode = 'r'), path,
+                          tile_size, halo)
+
+
+
+def write_csv(path, land):
+    """
+    Write a landscape to a .csv file, as the original land.txt.
+
+    Lines end with '\\n', as in land.txt, rather than the '\\r\\n' the
+    csv module writes by default.
 
+    Args:
+        path (str) -- Name of the .csv or .txt file.
+        land (array) -- Elevations, indexed land[y][x].
+    """
 
-w = 100 # Set width to 100.
-h = 100 # Set height to 100.
+    fmt = '%d' if numpy.issubdtype(land.dtype, numpy.integer) else '%.18g'
+    numpy.savetxt(path, land, fmt = fmt, delimiter = ',')
 
 
-land = [] # Create empty list called 'land'.
 
+def main(argv = None):
+    """
+    Make an artificial landscape from the command line.
 
-# Plot a 100 x 100 square.
-for y in range(0, h): # Cycle through coordinates (0, h) until h = 100.
-    row = [] # Create empty list called 'row'.
-    for x in range(0, w):
-        row.append(0) # Append 0 to 'row' at (0, w) until w = 100.
-    land.append(row) # Append each row created to the 'land' list.
+    Args:
+        argv (list) -- Command line arguments. Defaults to sys.argv.
+    """
 
+    parser = argparse.ArgumentParser(description = "Create elevation data "
+                                     "for use in the project.")
+    parser.add_argument('kind', nargs = '?', default = 'pyramid',
+                        choices = list(TERRAINS),
+                        help = "Landscape to make.")
+    parser.add_argument('--size', type = int, nargs = 2, default = [100, 100],
+                        metavar = ('W', 'H'), help = "Width and height.")
+    parser.add_argument('--seed', type = int, default = None,
+                        help = "Seed, for the landscapes that use one.")
+    parser.add_argument('--output', default = 'land.txt',
+                        help = "File to write: .txt or .csv for text, .npy "
+                        "for binary, or a directory for tiles.")
+    parser.add_argument('--tile-size', type = int, default = None,
+                        help = "Write tiles of this size to the output "
+                        "directory.")
+    parser.add_argument('--show', action = 'store_true',
+                        help = "Plot the landscape.")
+    args = parser.parse_args(argv)
 
-# Add relief to the 100 x 100 square.
-for y in range(0, h): # Cycle through coordinates (0, h) until h = 100.
-    for x in range(0, w): # Cycle through (0, w) until w = 100.
-        if (x + y) < w:
-            # If (x + y) < w, then the coordinate will = x + y.
-            land[y][x] = x + y
-        else :
-            # If not, the coordinate will = (w - x) + (h - y).
-            land[y][x] = (w - x) + (h - y)
+    w, h = args.size
+    params = {}
+    if args.seed is not None and args.kind != 'pyramid':
+        params['seed'] = args.seed
 
+    if args.tile_size is not None:
+        write_tiles(args.output, args.kind, w, h, args.tile_size, **params)
+    elif args.output.endswith('.npy'):
+        write_npy(args.output, args.kind, w, h, **params)
+    else:
+        write_csv(args.output, generate(args.kind, w, h, **params))
 
-# Plot 'land' on a graph.
-matplotlib.pyplot.ylim(0, h) # Limit of y axis.
-matplotlib.pyplot.xlim(0, w) # Limit of x axis.
-matplotlib.pyplot.imshow(land)
+    if args.show:
+        # Only imported here, so making landscapes does not need it.
+        import matplotlib.pyplot
 
+        matplotlib.pyplot.ylim(0, h) # Limit of y axis.
+        matplotlib.pyplot.xlim(0, w) # Limit of x axis.
+        matplotlib.pyplot.imshow(generate(args.kind, w, h, **params))
+        matplotlib.pyplot.show()
 
-print(land)
 
 
-# Create a new file 'land.txt' which contains the coordinate data.
-f = open('land.txt', 'w', newline='') 
-writer = csv.writer(f, delimiter=',')
-for row in land:		
-	writer.writerow(row)
-f.close()
+if __name__ == '__main__':
+    main()
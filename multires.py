@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:47:31 2026
+
+@author: agent
+
+Move raindrops across large landscapes a block of pixels at a time.
+
+On a large landscape most steps are spent moving raindrops one pixel at
+a time down long, even slopes. Instead, the landscape is split into
+square blocks of 2 x 2, 4 x 4, 8 x 8... pixels, and for every pixel and
+block size an exit table records where a raindrop starting on the pixel
+leaves the block, and after how many steps. A raindrop can then cross a
+whole block in one lookup. The tables are built from the flow-direction
+grid, so they follow the same rules as Rain.move() and give exactly the
+same results.
+
+Blocks that hold the lowest ground around them, found from a pyramid of
+minimum elevations (terrain.min_pyramid()), contain the sinks, outlet
+points and flats where raindrops stop or move back and forth. No exit
+tables are kept for them: raindrops are moved through them with smaller
+blocks, down to single pixels. Raindrops also switch to smaller blocks
+when they have fewer steps left than crossing a block would take.
+
+Building the tables takes much longer than building the tables of a
+flowgrid.JumpTable, and routing raindrops is no quicker than jumping
+them, so RainBatch.advance() is the faster way to move raindrops many
+steps. The router gives a second, independent way to check it.
+
+check() compares the results against Rain.move() and RainBatch.move().
+Can be run from the command line, e.g.:
+
+    python multires.py in.txt --drops 1000 --steps 100 --seed 1
+"""
+
+import argparse
+import sys
+import time
+import numpy
+import drainage
+import flowgrid
+import terrain
+
+
+# States in the exit tables.
+EXIT = 0 # The raindrop leaves the block.
+STOP = 1 # The raindrop stops on a sink or outlet point in the block.
+FINE = 2 # No exit; use smaller blocks.
+
+
+
+class BlockRouter():
+    """
+    Set up and provide methods for moving raindrops a block at a time.
+
+    __init__ -- Build the exit tables.
+    route -- Move raindrops a number of steps.
+    """
+
+    def __init__(self, land, length, receivers = None, stops = None,
+                 levels = None):
+        """
+        Build the exit tables.
+
+        Args:
+            land (list) -- Environment coordinate list or array.
+            length (int) -- Size of the environment to be used.
+            receivers (array) -- Optional flow-direction grid from
+                flowgrid.receivers(). Built from 'land' if not given.
+            stops (array) -- Optional flat array, True for pixels where
+                raindrops stop moving (e.g. outlet points).
+            levels (int) -- Number of block sizes. Level k has blocks of
+                2**k x 2**k pixels. Defaults to a number suited to the
+                size of the environment, at most 6.
+        """
+
+        n = length + 1
+        self.length = length
+
+        if receivers is None:
+            receivers = flowgrid.receivers(land, length)
+        rec = numpy.array(receivers, dtype = numpy.intp)
+        cells = numpy.arange(n * n)
+        if stops is not None:
+            rec[stops] = cells[stops]
+        self.receivers = rec
+
+        # Pixels raindrops move around forever. Raindrops reaching them
+        # are moved a pixel at a time.
+        self.loop = drainage.loops(rec)
+
+        if levels is None:
+            levels = max(1, min(6, n.bit_length() - 3))
+        self.levels = levels
+
+        # Level 0 is a single step through the flow-direction grid. The
+        # tables use the smallest integers that hold their values, as
+        # they have (levels + 1) entries for every pixel: crossing a
+        # block of 2**k x 2**k pixels never takes more than 4**k steps.
+        sink = rec == cells
+        exit_type = numpy.int32 if n * n <= 2 ** 31 else numpy.int64
+        step_type = numpy.int16 if 4 ** levels < 2 ** 15 else numpy.int32
+        self.exits = numpy.empty((levels + 1, n * n), dtype = exit_type)
+        self.steps = numpy.empty((levels + 1, n * n), dtype = step_type)
+        self.states = numpy.empty((levels + 1, n * n), dtype = numpy.int8)
+        self.exits[0] = rec
+        self.steps[0] = numpy.where(sink, 0, 1)
+        self.states[0] = numpy.where(sink, STOP, EXIT)
+
+        fine = self._fine_blocks(land, length, levels)
+        x, y = numpy.divmod(cells, n)
+        for k in range(1, levels + 1):
+            self._build(k, x, y, fine[k - 1])
+
+        self._jumps = None
+
+
+    @staticmethod
+    def _fine_blocks(land, length, levels):
+        """
+        Find the blocks that hold the lowest ground around them.
+
+        Args:
+            land (list) -- Environment coordinate list or array.
+            length (int) -- Size of the environment to be used.
+            levels (int) -- Number of block sizes.
+
+        Returns:
+            fine (list) -- Array for each level, True for blocks whose
+                minimum elevation is no higher than that of any of the 8
+                blocks around them.
+        """
+
+        fine = []
+        for level in terrain.min_pyramid(land, length, levels):
+            rows, cols = level.shape
+            padded = numpy.pad(level, 1, mode = 'constant',
+                               constant_values = numpy.inf)
+            lowest = numpy.full(level.shape, numpy.inf)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    lowest = numpy.minimum(lowest,
+                                           padded[1 + dx:rows + 1 + dx,
+                                                  1 + dy:cols + 1 + dy])
+            fine.append(level <= lowest)
+
+        return fine
+
+
+    def _build(self, k, x, y, fine):
+        """
+        Build the exit table for blocks of 2**k x 2**k pixels.
+
+        A raindrop is followed from every pixel using the tables for
+        smaller blocks, largest first, until it leaves the block or
+        stops. Paths reaching a pixel raindrops move around forever are
+        marked FINE.
+
+        Args:
+            k (int) -- Level.
+            x (array) -- x-coordinate of every pixel.
+            y (array) -- y-coordinate of every pixel.
+            fine (array) -- True for blocks at this level with no table.
+        """
+
+        n = self.length + 1
+        limit = 4 ** k
+        bx = x >> k
+        by = y >> k
+
+        self.exits[k] = numpy.arange(n * n)
+        self.steps[k] = 0
+        self.states[k] = FINE
+
+        todo = numpy.nonzero(~fine[bx, by] & ~self.loop)[0]
+        cur = todo.copy()
+        total = numpy.zeros(len(todo), dtype = numpy.int64)
+        level = numpy.full(len(todo), k - 1)
+        walking = numpy.arange(len(todo))
+
+        while walking.size:
+            c = cur[walking]
+            lv = level[walking]
+            state = self.states[lv, c]
+
+            # Use a smaller block where there is no table.
+            jump = state != FINE
+            level[walking[~jump]] -= 1
+
+            j = walking[jump]
+            cj = c[jump]
+            lj = lv[jump]
+            cur[j] = self.exits[lj, cj]
+            total[j] += self.steps[lj, cj]
+
+            stopped = state[jump] == STOP
+            nx, ny = numpy.divmod(cur[j], n)
+            left = ((nx >> k) != bx[todo[j]]) | ((ny >> k) != by[todo[j]])
+            loop = self.loop[cur[j]] | (total[j] > limit)
+            finished = stopped | left | loop
+
+            done = j[finished]
+            states = numpy.where(stopped[finished], STOP,
+                                 numpy.where(left[finished], EXIT, FINE))
+            self.exits[k, todo[done]] = cur[done]
+            self.steps[k, todo[done]] = numpy.where(states == FINE, 0,
+                                                    total[done])
+            self.states[k, todo[done]] = states
+
+            # Carry on from the largest block again.
+            level[j[~finished]] = k - 1
+            walking = numpy.concatenate((walking[~jump], j[~finished]))
+
+
+    def _advance(self, cells, steps):
+        """
+        Move raindrops a different number of steps each, one pixel at a
+        time, using a flowgrid.JumpTable.
+
+        Used for raindrops moving around a loop, which never leave it.
+
+        Args:
+            cells (array) -- Pixel indices of the raindrops.
+            steps (array) -- Number of steps for each raindrop.
+
+        Returns:
+            cells (array) -- Pixel indices after the steps.
+        """
+
+        most = int(steps.max())
+        if self._jumps is None or most >= 2 ** len(self._jumps.tables):
+            self._jumps = flowgrid.JumpTable(self.receivers, most)
+
+        cells = cells.copy()
+        i = 0
+        while most >> i:
+            move = (steps >> i) & 1 == 1
+            cells[move] = self._jumps.tables[i][cells[move]]
+            i = i + 1
+
+        return cells
+
+
+    def route(self, cells, steps = None):
+        """
+        Move raindrops a number of steps.
+
+        Gives the same pixels as moving each raindrop 'steps' times
+        through the flow-direction grid. Each raindrop crosses the
+        largest block it can. Where there is no table for the block, or
+        crossing it would take more steps than are left, a smaller block
+        is used.
+
+        Args:
+            cells (array) -- Pixel indices of the raindrops.
+            steps (int) -- Number of steps. If not given, raindrops are
+                moved until every one has stopped or reached a loop, in
+                flowgrid.JumpTable.end_steps steps, as in
+                RainBatch.advance().
+
+        Returns:
+            cells (array) -- Pixel indices after the steps.
+        """
+
+        if steps is None:
+            if self._jumps is None or self._jumps.end_steps is None:
+                self._jumps = flowgrid.JumpTable(self.receivers)
+            steps = self._jumps.end_steps
+
+        top = self.levels
+        cur = numpy.array(cells, dtype = numpy.intp)
+        left = numpy.full(len(cur), steps, dtype = numpy.int64)
+        level = numpy.full(len(cur), top)
+
+        # Raindrops moving around a loop are finished with _advance().
+        looping = [numpy.nonzero((left > 0) & self.loop[cur])[0]]
+
+        moving = numpy.nonzero((left > 0) & ~self.loop[cur])[0]
+        while moving.size:
+            c = cur[moving]
+            lv = level[moving]
+            state = self.states[lv, c]
+            taken = self.steps[lv, c]
+            jump = (state != FINE) & (taken <= left[moving])
+
+            # Use a smaller block. Single pixels can always be crossed.
+            level[moving[~jump]] -= 1
+
+            j = moving[jump]
+            cur[j] = self.exits[lv[jump], c[jump]]
+            left[j] -= taken[jump]
+            level[j] = top
+
+            going = (state[jump] != STOP) & (left[j] > 0)
+            loop = going & self.loop[cur[j]]
+            looping.append(j[loop])
+            moving = numpy.concatenate((moving[~jump], j[going & ~loop]))
+
+        looping = numpy.concatenate(looping)
+        if len(looping):
+            cur[looping] = self._advance(cur[looping], left[looping])
+
+        return cur
+
+
+
+def check(land, length, num_of_drops, num_of_steps, seed = None,
+          levels = None):
+    """
+    Check that moving raindrops a block at a time gives the same results
+    as moving them a pixel at a time.
+
+    The same raindrops are moved:
+
+        - with Rain.move() and with BlockRouter.route(), comparing the
+          final coordinates of every raindrop;
+        - with RainBatch.move() and RainBatch.route(), stopping at the
+          outlet points, comparing the final coordinates and the number
+          of raindrops at each outlet point.
+
+    Args:
+        land (list) -- Environment coordinate list or array.
+        length (int) -- Size of the environment to be used.
+        num_of_drops (int) -- Number of raindrops.
+        num_of_steps (int) -- Number of iterations.
+        seed (int) -- Seed for the random placement of raindrops.
+        levels (int) -- Number of block sizes, see BlockRouter.
+
+    Returns:
+        report (dict) -- Number of raindrops whose final coordinates
+            differ from Rain.move() ('move_mismatches') and from
+            RainBatch.move() ('batch_mismatches'), number of outlet
+            points with a different count ('outlet_mismatches'), and the
+            time taken by each method in seconds.
+    """
+
+    # Imported here, as they use this module.
+    import rainbatch
+    import rainframework
+    import outlets
+    import pathlog
+
+    n = length + 1
+    x, y = rainbatch.random_positions(length, num_of_drops, seed)
+    receivers = flowgrid.receivers(land, length)
+
+    # Rain.move(), one raindrop and one pixel at a time.
+    start = time.perf_counter()
+    all_drops = pathlog.NullPathLog()
+    raindrops = []
+    for i in range(num_of_drops):
+        agent = rainframework.Rain(land, raindrops, all_drops, length, 0, 0)
+        agent.x = int(x[i])
+        agent.y = int(y[i])
+        raindrops.append(agent)
+    for j in range(num_of_steps):
+        for agent in raindrops:
+            agent.move()
+    move_seconds = time.perf_counter() - start
+    moved = numpy.array([agent.x * n + agent.y for agent in raindrops],
+                        dtype = numpy.intp)
+
+    start = time.perf_counter()
+    router = BlockRouter(land, length, receivers, levels = levels)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    routed = router.route(x * n + y, num_of_steps)
+    route_seconds = time.perf_counter() - start
+
+    # RainBatch, stopping at the outlet points.
+    outlet_points = outlets.Outlets(terrain.area(land, length))
+    stepped = rainbatch.RainBatch(land, length, x, y, receivers,
+                                  outlet_points)
+    for j in range(num_of_steps):
+        stepped.move()
+    jumped = rainbatch.RainBatch(land, length, x, y, receivers,
+                                 outlet_points)
+    jumped.route(num_of_steps, levels)
+
+    return {'drops': num_of_drops, 'steps': num_of_steps,
+            'levels': router.levels,
+            'move_mismatches': int((moved != routed).sum()),
+            'batch_mismatches': int(((stepped.x != jumped.x) |
+                                     (stepped.y != jumped.y)).sum()),
+            'outlet_mismatches': int((stepped.outlet_counts !=
+                                      jumped.outlet_counts).sum()),
+            'move_seconds': move_seconds, 'build_seconds': build_seconds,
+            'route_seconds': route_seconds}
+
+
+
+def main(argv = None):
+    """
+    Check moving raindrops a block at a time from the command line.
+
+    Args:
+        argv (list) -- Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        1 if any results differ, otherwise 0.
+    """
+
+    parser = argparse.ArgumentParser(description = "Check moving raindrops "
+                                     "a block at a time against moving them "
+                                     "a pixel at a time.")
+    parser.add_argument('land', help = "File containing environment data "
+                        "(.csv or .npy).")
+    parser.add_argument('--drops', type = int, default = 1000,
+                        help = "Number of raindrops.")
+    parser.add_argument('--steps', type = int, default = 100,
+                        help = "Number of iterations.")
+    parser.add_argument('--seed', type = int, default = None,
+                        help = "Seed for the random placement of raindrops.")
+    parser.add_argument('--length', type = int, default = None,
+                        help = "Size of the environment to be used.")
+    parser.add_argument('--levels', type = int, default = None,
+                        help = "Number of block sizes.")
+    args = parser.parse_args(argv)
+
+    land = terrain.load_land(args.land)
+    length = len(land) - 1 if args.length is None else args.length
+    report = check(land, length, args.drops, args.steps, args.seed,
+                   args.levels)
+
+    for key, value in report.items():
+        print(key + ": " + str(value))
+
+    if report['move_mismatches'] or report['batch_mismatches'] or \
+    report['outlet_mismatches']:
+        print("Results differ from moving raindrops a pixel at a time.")
+        return 1
+
+    print("Results match moving raindrops a pixel at a time.")
+    return 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:20:51 2026
+
+@author: agent
+
+Find outlet points and the volume of water that has reached them.
+
+Outlet points are the pixels of the landscape with the minimum
+elevation. Each outlet point is given a number, stored in a grid the
+same size as the landscape, so the outlet (if any) under a raindrop is
+found with a single lookup rather than by comparing the raindrop with
+every outlet point.
+"""
+
+import numpy
+
+
+# Volume of a raindrop is (4/3) * pi * radius**3. The value of pi used
+# is the same as in project.py.
+PI = 3.14159
+
+
+
+def drop_volume(radius):
+    """
+    Calculate the volume of a single raindrop in cm**3.
+
+    Assumes all the raindrops are spherical with equal radii.
+
+    Args:
+        radius (float) -- Radius of the raindrops.
+
+    Returns:
+        vol (float) -- Volume of a raindrop.
+    """
+
+    return (4/3) * PI * (radius**3)
+
+
+
+class Outlets():
+    """
+    Set up and provide methods for the outlet points of a landscape.
+
+    __init__ -- Find the outlet points.
+    from_coords -- Set up outlet points from known coordinates.
+    count -- Count the raindrops at each outlet point.
+    """
+
+    def __init__(self, area, min_elev = None):
+        """
+        Find the outlet points.
+
+        Args:
+            area (array) -- Elevations of the environment to be used,
+                e.g. from terrain.area().
+            min_elev (float) -- Minimum elevation. Found from 'area' if
+                not given.
+        """
+
+        area = numpy.asarray(area)
+
+        if min_elev is None:
+            min_elev = area.min()
+
+        # Coordinates of the outlet points.
+        x, y = numpy.nonzero(area <= min_elev)
+        self._set_index(area.shape, x, y)
+
+
+    @classmethod
+    def from_coords(cls, length, x, y):
+        """
+        Set up outlet points from known coordinates.
+
+        Avoids searching the landscape again if the outlet points are
+        already known, e.g. from terrain.stats().
+
+        Args:
+            length (int) -- Size of the environment to be used.
+            x (array) -- Outlet point x-coordinates.
+            y (array) -- Outlet point y-coordinates.
+
+        Returns:
+            outlets (Outlets) -- Outlet points.
+        """
+
+        outlets = cls.__new__(cls)
+        outlets._set_index((length + 1, length + 1), x, y)
+
+        return outlets
+
+
+    def _set_index(self, shape, x, y):
+        """
+        Number the outlet points.
+
+        Args:
+            shape (tuple) -- Shape of the environment to be used.
+            x (array) -- Outlet point x-coordinates.
+            y (array) -- Outlet point y-coordinates.
+        """
+
+        self.x = numpy.asarray(x, dtype = numpy.intp)
+        self.y = numpy.asarray(y, dtype = numpy.intp)
+
+        # Number of the outlet point at each pixel, or -1 if the pixel
+        # is not an outlet point.
+        self.index = numpy.full(shape, -1, dtype = numpy.intp)
+        self.index[self.x, self.y] = numpy.arange(len(self.x))
+
+
+    def __len__(self):
+        """
+        Get the number of outlet points.
+        """
+
+        return len(self.x)
+
+
+    def count(self, x, y):
+        """
+        Count the raindrops at each outlet point.
+
+        Args:
+            x (array) -- Raindrop x-coordinates.
+            y (array) -- Raindrop y-coordinates.
+
+        Returns:
+            counts (array) -- Number of raindrops at each outlet point,
+                in the same order as self.x and self.y.
+        """
+
+        index = self.index[numpy.asarray(x), numpy.asarray(y)]
+
+        return numpy.bincount(index[index >= 0], minlength = len(self))
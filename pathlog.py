@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:20:15 2026
+
+@author: agent
+
+Record the paths taken by the raindrops.
+
+Rather than keeping a list of every coordinate a raindrop has moved to,
+count the number of times a raindrop has moved onto each pixel. The
+memory used no longer grows with the length of the model run, and
+finding the pixels that 3 or more raindrops have moved through takes a
+single pass over the landscape rather than a count of the whole list
+for each coordinate.
+
+Paths can also be written to a binary log file on disk (BinaryPathLog),
+or not recorded at all (NullPathLog). All three provide the same
+methods, so they can be used in place of one another; open_sink() makes
+one by name.
+"""
+
+import os
+import numpy
+
+
+# Start of every binary path log file, followed by the size of the
+# environment as a 64-bit integer.
+LOG_MAGIC = b'RAINLOG1'
+HEADER_SIZE = len(LOG_MAGIC) + 8
+
+
+class VisitRaster():
+    """
+    Count the number of times raindrops move onto each pixel.
+
+    Can be used in place of the 'all_drops' list: Rain.move() records
+    each step with append() and RainBatch.move() records all steps at
+    once with record().
+
+    __init__ -- Set up the counts.
+    append -- Record a single step.
+    record -- Record a step for many raindrops.
+    add -- Add counts found some other way.
+    coords -- Get the coordinates of pixels moved through.
+    """
+
+    def __init__(self, length):
+        """
+        Set up the counts.
+
+        Args:
+            length (int) -- Size of the environment to be used.
+        """
+
+        # Counts are indexed [x, y], like 'land'.
+        self.counts = numpy.zeros((length + 1, length + 1),
+                                  dtype = numpy.int64)
+
+
+    def append(self, coord):
+        """
+        Record a single step.
+
+        Args:
+            coord (tuple) -- New (y, x) coordinate of a raindrop, as
+                appended to 'all_drops' by Rain.move().
+        """
+
+        self.counts[coord[1], coord[0]] += 1
+
+
+    def record(self, x, y):
+        """
+        Record a step for many raindrops.
+
+        Args:
+            x (array) -- New x-coordinates of the raindrops that moved.
+            y (array) -- New y-coordinates of the raindrops that moved.
+        """
+
+        # numpy.add.at() counts raindrops that land on the same pixel.
+        numpy.add.at(self.counts, (x, y), 1)
+
+
+    def add(self, counts):
+        """
+        Add counts found some other way.
+
+        Used when raindrops are moved many steps at once, e.g. with
+        RainBatch.advance().
+
+        Args:
+            counts (array) -- Number of moves onto each pixel, indexed
+                [x, y].
+        """
+
+        self.counts += counts
+
+
+    def coords(self, threshold = 1):
+        """
+        Get the coordinates of pixels moved through.
+
+        Args:
+            threshold (int) -- Minimum number of times a raindrop must
+                have moved onto a pixel for it to be included.
+
+        Returns:
+            y (array) -- y-coordinates of the pixels.
+            x (array) -- x-coordinates of the pixels.
+        """
+
+        x, y = numpy.nonzero(self.counts >= threshold)
+
+        # Returned in the same (y, x) order as 'all_drops' for plotting.
+        return y, x
+
+
+
+def read_header(path):
+    """
+    Check that a file is a binary path log and read its header.
+
+    Args:
+        path (str) -- Name of the file.
+
+    Returns:
+        length (int) -- Size of the environment the paths were recorded
+            on.
+    """
+
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+
+    if len(header) < HEADER_SIZE or header[:len(LOG_MAGIC)] != LOG_MAGIC:
+        raise ValueError(path + " is not a binary path log.")
+
+    length = numpy.frombuffer(header[len(LOG_MAGIC):], dtype = numpy.int64)
+
+    return int(length[0])
+
+
+
+class BinaryPathLog():
+    """
+    Write the paths taken by the raindrops to a binary file.
+
+    Each move onto a pixel is stored as the index of the pixel,
+    x * (length + 1) + y, as a 32-bit integer. Moves are kept in memory
+    until a block is full and are then appended to the file, so memory
+    use does not grow with the length of the model run. The file is
+    read back one block at a time.
+
+    The file starts with LOG_MAGIC and the size of the environment, which
+    are checked when an existing file is opened, e.g. to read the paths
+    of an earlier run or to carry on writing to it.
+
+    __init__ -- Create the file, or open it to add more moves.
+    open -- Open an existing file.
+    num_moves -- Get the number of moves recorded.
+    append -- Record a single step.
+    record -- Record a step for many raindrops.
+    add -- Add counts found some other way.
+    flush -- Write any moves kept in memory to the file.
+    truncate -- Forget all but the first moves recorded.
+    blocks -- Read the moves back from the file.
+    coords -- Get the coordinates of pixels moved through.
+    """
+
+    def __init__(self, path, length, block_size = 65536, mode = 'w'):
+        """
+        Create the file, or open it to add more moves.
+
+        Args:
+            path (str) -- Name of the file.
+            length (int) -- Size of the environment to be used.
+            block_size (int) -- Number of moves written or read at once.
+            mode (str) -- 'w' to replace an existing file, or 'a' to add
+                moves to the end of it. The file is created if it does
+                not exist.
+        """
+
+        if (length + 1) ** 2 > 2 ** 31:
+            raise ValueError("Environment is too large for 32-bit pixel "
+                             "indices.")
+        if mode not in ('w', 'a'):
+            raise ValueError("Unknown mode '" + str(mode) + "'; use 'w' or "
+                             "'a'.")
+
+        self.path = path
+        self.length = length
+        self.block_size = block_size
+        self._pending = []
+        self._num_pending = 0
+
+        if mode == 'a' and os.path.exists(path):
+            if read_header(path) != length:
+                raise ValueError(path + " was written for an environment "
+                                 "of length " + str(read_header(path)) +
+                                 ", not " + str(length) + ".")
+            size = os.path.getsize(path) - HEADER_SIZE
+            if size % 4:
+                # The last move was only partly written.
+                os.truncate(path, HEADER_SIZE + size - size % 4)
+            self._num_written = size // 4
+        else:
+            with open(path, 'wb') as f:
+                f.write(LOG_MAGIC)
+                f.write(numpy.int64(length).tobytes())
+            self._num_written = 0
+
+
+    @classmethod
+    def open(cls, path, block_size = 65536):
+        """
+        Open an existing file.
+
+        Moves recorded are added to the end of the file.
+
+        Args:
+            path (str) -- Name of the file.
+            block_size (int) -- Number of moves written or read at once.
+
+        Returns:
+            log (BinaryPathLog) -- The path log.
+        """
+
+        return cls(path, read_header(path), block_size, mode = 'a')
+
+
+    @property
+    def num_moves(self):
+        """
+        Get the number of moves recorded.
+
+        Returns:
+            The number of moves in the file and kept in memory.
+        """
+
+        return self._num_written + self._num_pending
+
+
+    def _write(self, cells):
+        """
+        Keep moves in memory, writing them to the file once a block is
+        full.
+
+        Args:
+            cells (array) -- Pixel indices.
+        """
+
+        self._pending.append(numpy.asarray(cells, dtype = numpy.int32))
+        self._num_pending = self._num_pending + len(cells)
+        if self._num_pending >= self.block_size:
+            self.flush()
+
+
+    def append(self, coord):
+        """
+        Record a single step.
+
+        Args:
+            coord (tuple) -- New (y, x) coordinate of a raindrop.
+        """
+
+        self._write([coord[1] * (self.length + 1) + coord[0]])
+
+
+    def record(self, x, y):
+        """
+        Record a step for many raindrops.
+
+        Args:
+            x (array) -- New x-coordinates of the raindrops that moved.
+            y (array) -- New y-coordinates of the raindrops that moved.
+        """
+
+        self._write(numpy.asarray(x) * (self.length + 1) + numpy.asarray(y))
+
+
+    def add(self, counts):
+        """
+        Add counts found some other way.
+
+        Each pixel is written once for each move onto it. The order of
+        these moves is not known, so they are written pixel by pixel.
+
+        Args:
+            counts (array) -- Number of moves onto each pixel, indexed
+                [x, y].
+        """
+
+        counts = numpy.asarray(counts).ravel()
+        self._write(numpy.repeat(numpy.arange(len(counts)), counts))
+
+
+    def flush(self):
+        """
+        Write any moves kept in memory to the file.
+        """
+
+        if self._pending:
+            with open(self.path, 'ab') as f:
+                numpy.concatenate(self._pending).tofile(f)
+            self._num_written = self._num_written + self._num_pending
+            self._pending = []
+            self._num_pending = 0
+
+
+    def truncate(self, num_moves):
+        """
+        Forget all but the first moves recorded.
+
+        Used to carry on a run from a checkpoint, throwing away the moves
+        recorded after it was saved.
+
+        Args:
+            num_moves (int) -- Number of moves to keep.
+        """
+
+        self.flush()
+        if num_moves > self._num_written:
+            raise ValueError(self.path + " holds " + str(self._num_written) +
+                             " moves, fewer than the " + str(num_moves) +
+                             " to keep.")
+
+        os.truncate(self.path, HEADER_SIZE + 4 * num_moves)
+        self._num_written = num_moves
+
+
+    def blocks(self):
+        """
+        Read the moves back from the file.
+
+        Yields:
+            cells (array) -- Pixel indices of up to 'block_size' moves.
+        """
+
+        self.flush()
+
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER_SIZE)
+            while True:
+                cells = numpy.fromfile(f, dtype = numpy.int32,
+                                       count = self.block_size)
+                if not len(cells):
+                    break
+                yield cells
+
+
+    def coords(self, threshold = 1):
+        """
+        Get the coordinates of pixels moved through.
+
+        The file is read one block at a time, counting the moves onto
+        each pixel.
+
+        Args:
+            threshold (int) -- Minimum number of times a raindrop must
+                have moved onto a pixel for it to be included.
+
+        Returns:
+            y (array) -- y-coordinates of the pixels.
+            x (array) -- x-coordinates of the pixels.
+        """
+
+        n = self.length + 1
+        counts = numpy.zeros(n * n, dtype = numpy.int64)
+        for cells in self.blocks():
+            counts += numpy.bincount(cells, minlength = n * n)
+
+        x, y = numpy.divmod(numpy.nonzero(counts >= threshold)[0], n)
+
+        return y, x
+
+
+
+class NullPathLog():
+    """
+    Do not record the paths taken by the raindrops.
+
+    Provides the same methods as VisitRaster so it can be used in its
+    place when the drainage network is not needed.
+
+    append -- Ignore a single step.
+    record -- Ignore a step for many raindrops.
+    add -- Ignore counts found some other way.
+    coords -- Get no coordinates.
+    """
+
+    def append(self, coord):
+        """
+        Ignore a single step.
+        """
+
+        pass
+
+
+    def record(self, x, y):
+        """
+        Ignore a step for many raindrops.
+        """
+
+        pass
+
+
+    def add(self, counts):
+        """
+        Ignore counts found some other way.
+        """
+
+        pass
+
+
+    def coords(self, threshold = 1):
+        """
+        Get no coordinates, as no paths are recorded.
+        """
+
+        return numpy.array([], dtype = int), numpy.array([], dtype = int)
+
+
+
+def open_sink(kind, length, path = None, append = False):
+    """
+    Set up somewhere to record the paths taken by the raindrops.
+
+    Args:
+        kind (str) -- "raster" for a VisitRaster, "log" for a
+            BinaryPathLog or "none" for a NullPathLog.
+        length (int) -- Size of the environment to be used.
+        path (str) -- Name of the file, for "log".
+        append (bool) -- Add to the end of an existing file, for "log",
+            e.g. when carrying on a run from a checkpoint.
+
+    Returns:
+        The VisitRaster, BinaryPathLog or NullPathLog.
+    """
+
+    if kind == 'raster':
+        return VisitRaster(length)
+    if kind == 'log':
+        if path is None:
+            raise ValueError("A file name is needed for a path log.")
+        return BinaryPathLog(path, length, mode = 'a' if append else 'w')
+    if kind == 'none':
+        return NullPathLog()
+
+    raise ValueError("Unknown path sink '" + str(kind) + "'; use 'raster', "
+                     "'log' or 'none'.")
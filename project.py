@@ -11,7 +11,7 @@ Build raindrops as agents in a space. Read in environmental data and get
 the agents to move downslope. Display the movement of raindrops as an 
 animation contained within a GUI. Display plots of the drainage paths 
 taken by the raindrops within a GUI. Calculate the total volume of water
-that has reached an outlet point and append this to a file.
+that has reached an outlet point and add this to a results store.
 
 Args:
     num_of_drops (int) -- Number of raindrops.
@@ -23,211 +23,474 @@ Returns:
     animation -- Animates the model.
     total_vol (float) -- Total volume of water that has reached an
         outlet point.
-    outlet_vol (.csv) -- File containing total volume of water that has 
-        reached an outlet point.
+    results -- Directory of results, containing the total volume of water
+        that has reached an outlet point for each model run.
     Scatter plot showing all coordinates of the raindrops for all 
         iterations of the model.
     Scatter plot showing coordinates where 3 or more raindrops have 
         moved through.
 """
 
-import csv
-import matplotlib.pyplot
-import matplotlib.animation
-import rainframework
-import tkinter
-import matplotlib.backends.backend_tkagg
+import os
+import queue
+import threading
+import time
+import instrument
 
-
-# Read in environment data and append to new list 'land'.
-f = open('in.txt', newline = '') 
-land = []
-reader = csv.reader(f, quoting = csv.QUOTE_NONNUMERIC)
-for row in reader:
-    rowlist = []
-    for item in row:
-        rowlist.append(item)
-    land.append(rowlist)
-f.close()
+# NumPy, matplotlib, tkinter and the modules using them are imported by 
+# the functions that need them, so importing this module (e.g. to read 
+# its parameters) is fast and does not open a window. Run the model and 
+# the GUI with main().
 
 
 # Set up parameters.
+land_path = 'in.txt' # File containing environment data.
 num_of_drops = 100
 num_of_steps = 100
 radius = 0.3 # Allow user to set the radius of the droplets.
+common_threshold = 3 # Raindrops needed for a pixel to be 'common'.
+seed = None # Set to an integer to repeat the placement of raindrops.
+# Record raindrop paths as counts for each pixel ("raster"), in the file 
+# 'paths.log' ("log"), or not at all ("none").
+path_sink = 'raster'
+# Plot drainage networks from the flow accumulation of every pixel 
+# rather than from the paths of the raindrops in the model run.
+use_flow_accumulation = False
+# Fill depressions in the landscape before finding where raindrops move,
+# so raindrops no longer stop in sinks or move back and forth on flats.
+fill_sinks = False
+# Time each phase of the model run and count the raindrops moving, shown 
+# in the status bar and saved with "Save profile trace". Costs nothing 
+# when False.
+instrument_run = False
+# Save the state of the model run to this file (e.g. 'checkpoint.npz') 
+# every 'checkpoint_every' iterations, in the background, or None to not 
+# save it. With 'resume = True', a run saved in the file is carried on 
+# where it was left rather than starting again.
+checkpoint_path = None
+checkpoint_every = 100
+resume = False
 
 # Set length to determine size of environment to be used.
 length = 99
 # Do not set to greater than len(land) - 1.
 # Allows the program to be used for different environmental datasets.
 
-# Set up list of raindrops as agents.
+# Set by setup_model() and build_gui(), rather than when this module is 
+# imported.
+land = None
+recorder = instrument.NULL_RECORDER
 raindrops = []
+batch = None
+fig = None
+ax = None
 
-# Set up list of all raindrop coordinates for all model iterations.
-all_drops = []
 
-# Set up list of elevations in the landscape.
-elevs = []
 
-# Set up list of coordinates making up the landscape.
-coords = []
+def setup_model():
+    """
+    Set up the model.
+    
+    Read in the environment data, find the outlet points and the 
+    flow-direction grid, and create the raindrops.
+    """
+    
+    global land, recorder, raindrops, all_drops, land_stats, min_elev
+    global outlet_points, land_hash, store, receivers, batch
+    global rng, checkpointer, steps_run, drop_steps
+    
+    import rainbatch
+    import flowgrid
+    import terrain
+    import pathlog
+    import outlets
+    import results
+    import checkpoint
+    import numpy
+    
+    # Read in environment data.
+    # The data is converted to a binary file on the first run and read 
+    # from that file on later runs. 'land' can be indexed as land[x][y].
+    land = terrain.load_land(land_path)
+    
+    # Set up the recorder of phase times and counters.
+    if instrument_run:
+        recorder = instrument.Recorder()
+    else:
+        recorder = instrument.NULL_RECORDER
+    
+    # Carry on a saved run, if there is one, rather than starting again.
+    resuming = resume and checkpoint_path is not None and \
+    os.path.exists(checkpoint_path)
+    
+    # Set up a record of the raindrops moving onto each pixel for all 
+    # model iterations. Used in place of a list of all raindrop 
+    # coordinates. When carrying on a run, moves are added to the end of 
+    # the saved path log.
+    all_drops = pathlog.open_sink(path_sink, length, 'paths.log', 
+                                  append = resuming)
+    
+    # Find the minimum elevation and the coordinates of the points of
+    # minimum elevation (outlet points) in the landscape. These are 
+    # cached next to the environment data so they are only found again 
+    # if the data changes.
+    land_stats = terrain.stats(land, length, land_path)
+    min_elev = land_stats['min_elev']
+    
+    # Number each outlet point so the outlet under a raindrop can be found
+    # with a single lookup.
+    outlet_points = outlets.Outlets.from_coords(length, land_stats['outlet_x'],
+                                                land_stats['outlet_y'])
+    
+    # Identify the landscape in the results store, so runs on different
+    # landscapes are not mixed up.
+    land_hash = results.grid_hash(terrain.area(land, length))
+    
+    # Set up the store for the volumes of water found by volume().
+    store = results.ResultStore('results')
+    
+    # Find the next position of a raindrop on every pixel of the 
+    # landscape. The landscape does not change, so this is only done 
+    # once.
+    if fill_sinks:
+        receivers = flowgrid.receivers(terrain.fill_depressions(land, length),
+                                       length)
+    else:
+        receivers = flowgrid.receivers(land, length)
+    
+    # Set up a random number generator for placing the raindrops.
+    rng = numpy.random.default_rng(seed)
+    
+    # Place all raindrops at once, holding their coordinates in arrays so 
+    # they can be moved together. Raindrops that reach an outlet point 
+    # stop and are counted there.
+    batch = rainbatch.RainBatch.random(land, length, num_of_drops, rng, 
+                                       receivers = receivers, 
+                                       outlets = outlet_points)
+    
+    # The batch can be used as the list of raindrops: indexing it gives a 
+    # view of a single raindrop, made only when it is needed.
+    raindrops = batch
+    
+    # Carry on a saved run, on the same landscape, from where it was 
+    # left. Paths recorded after the run was saved are thrown away.
+    if resuming:
+        state = checkpoint.load(checkpoint_path)
+        if state['values'].get('grid_hash') != land_hash:
+            raise ValueError(checkpoint_path + " was saved from a run on a "
+                             "different landscape.")
+        steps_run = checkpoint.restore(state, batch, rng, all_drops)
+        drop_steps = state['values'].get('drop_steps', 0)
+    
+    # Save the state of the run in the background as it runs.
+    checkpointer = None
+    if checkpoint_path is not None:
+        checkpointer = checkpoint.Checkpointer(checkpoint_path, 
+                                               checkpoint_every)
 
-# Set up list of coordinates with minimum elevation in the landscape.
-min_coords = []
 
 
-# Append all elevation values to a list.
-# Ranges are 0 - 100 as this is the range which will be plotted.
-for i in range(0, length + 1):
-    for j in range(0, length + 1):
-        elevs.append(land[i][j])
-          
-min_elev = min(elevs) # Find the minimum elevation in the 'elevs' list.
+def plot_init():
+    """
+    Set-up the plot figure.
+    
+    Set-up the plot figure by providing the limits for the x-axis and
+    y-axis, and displaying the environment data in the plot.
+    """
+    
+    ax.clear() # Remove anything plotted before.
+    ax.set_ylim(0, length) # Set limit of y axis.
+    ax.set_xlim(0, length) # Set limit of x axis.
+    ax.imshow(land) # Display environment in plot.
+
 
-# Append coordinates associated with each elevation value to a list.
-# Ranges are 0 - 100 as this is the range which will be plotted.
-for j in range(0, length + 1):
-    for i in range(0, length + 1):
-        coords.append((i, j))
 
+def animation_init():
+    """
+    Set-up the plot figure for the animation.
     
-# Find the coordinates associated with the minimum elevation.
-# Append these coordinates to 'min_coords' list.
-# The following code is altered from that at:
-# https://stackoverflow.com/questions/3873361/   
-for position, item in enumerate(elevs):
-    if item <= min_elev:
-        min_coords.append(coords[position])
+    Draw the environment and points of minimum elevation once, and 
+    create a single scatter plot of the raindrops which is moved in each 
+    frame, rather than drawing everything again.
+    
+    Returns:
+        drop_points (PathCollection) -- Scatter plot of the raindrops.
+    """
+    
+    global drop_points
+    
+    plot_init() # Set up plot.
+    
+    # Plot points of minimum elevation in the colour black.
+    ax.scatter(outlet_points.y, outlet_points.x, color = 'black')
+    
+    # Plot all agents on a scatter graph in the colour blue. Only this 
+    # is redrawn in each frame.
+    drop_points = ax.scatter(batch.y, batch.x, color = 'blue', 
+                             animated = True)
+    
+    # Time drawing the raindrops in each frame. matplotlib calls this 
+    # after update() has returned.
+    drop_points.draw = recorder.timed('draw', drop_points.draw)
+    
+    return drop_points,
+
+
+  
+carry_on = True   
+steps_run = 0 # Number of iterations the model has run.
+drop_steps = 0 # Number of raindrop moves tried, for the recorder.
 
+# Raindrop coordinates passed from the model to the animation. Only the 
+# most recent coordinates are kept, so the model never waits for the 
+# animation and the animation skips any frames it is too slow to show.
+frames = queue.Queue(maxsize = 2)
 
+# Thread the model is run in.
+model_thread = None
 
-# Set up the figure for later use in the animation.
-fig = matplotlib.pyplot.figure(figsize = (7, 7))
-ax = fig.add_axes([0, 0, 1, 1])
+# Time the last frame was shown, for the recorder.
+last_frame = None
 
+# Whether the animation still has frames to show.
+animating = False
 
 
-# Append coordinates of the raindrops to the 'raindrops' list.
-for i in range(num_of_drops):
-    y = 0
-    x = 0
-    raindrops.append(rainframework.Rain(land, raindrops, all_drops, length, 
-                                        x, y))
+def model_step():
+    """
+    Move raindrops downslope by one iteration.
+    
+    Move the raindrops downslope in the environment. Provide a stopping
+    condition for the model.
+    """
+    
+    global carry_on, drop_steps
+    
+    active = batch.num_active
+    with recorder.phase('move'):
+        moved = batch.move(all_drops) # Move the raindrops downslope.
+    
+    if recorder.enabled:
+        # Raindrops that did not move have stalled on a sink.
+        drop_steps = drop_steps + active
+        recorder.count(step = steps_run + 1, active = batch.num_active, 
+                       drop_steps = drop_steps, 
+                       stalled = active - len(moved))
+
+    # Create stopping condition. Raindrops stop moving once they reach a 
+    # point of minimum elevation or a sink, so only the number still 
+    # moving needs to be checked.
+    stop = batch.num_active == 0
+    
+    # Model stops running if no raindrops are still moving.
+    if stop is True:
+        carry_on = False
+        if batch.outlet_counts.sum() == num_of_drops:
+            print("All raindrops have reached a point of minimum elevation.")
+        else:
+            print("Not all raindrops were able to reach a point of minimum \
+elevation. Stagnant raindrops have reached a sink in the landscape.")
 
 
 
-def plot_init():
+def push_frame(coords):
     """
-    Set-up the plot figure.
+    Pass the latest raindrop coordinates to the animation.
     
-    Set-up the plot figure by providing the limits for the x-axis and
-    y-axis, and displaying the environment data in the plot.
+    If the queue is full, the oldest coordinates are thrown away.
+    
+    Args:
+        coords (array) -- Coordinates of the raindrops, as (y, x) pairs.
     """
     
-    matplotlib.pyplot.ylim(0, length) # Set limit of y axis.
-    matplotlib.pyplot.xlim(0, length) # Set limit of x axis.
-    matplotlib.pyplot.imshow(land) # Display environment in plot.
+    try:
+        frames.put_nowait(coords)
+    except queue.Full:
+        try:
+            frames.get_nowait() # Throw away the oldest coordinates.
+        except queue.Empty:
+            pass
+        frames.put_nowait(coords)
 
 
-  
-carry_on = True   
+
+def run_model():
+    """
+    Run the model.
+    
+    Move the raindrops until the stopping condition or the maximum 
+    number of iterations has been met. Run in a thread separate from the 
+    GUI, passing the raindrop coordinates to the animation after each 
+    iteration.
+    """
+    
+    global steps_run
+    
+    import numpy
+    
+    a = steps_run # Carries on from a checkpoint, see setup_model().
+    while (a < num_of_steps) & (carry_on):
+        model_step()
+        push_frame(numpy.column_stack((batch.y, batch.x)))
+        a = a + 1
+        steps_run = a
+        if checkpointer is not None:
+            checkpointer.update(batch, steps_run, rng, all_drops, 
+                                grid_hash = land_hash, 
+                                drop_steps = drop_steps)
+    
+    if checkpointer is not None:
+        checkpointer.save(batch, steps_run, rng, all_drops, 
+                          grid_hash = land_hash, drop_steps = drop_steps)
+        checkpointer.close()
+    
+    if carry_on == True:
+        print("Not all raindrops were able to reach a point of minimum \
+elevation. Stagnant or oscillating raindrops have reached a sink in the \
+landscape.")
+        
+    print("End of model run.")
+
 
 
 def update(frame_number):
     """
-    Move raindrops and create frames for use in animation.
+    Create frames for use in animation.
     
-    Move the raindrops downslope in the environment. Provide a stopping
-    condition for the model. Create frames for use in the animation.
+    Show the latest raindrop coordinates from the model, skipping any 
+    older ones that have not been shown.
     
     Args:
         frame_number (int) -- Number of each frame generated.
         
     Returns:
-        Scatter plot of raindrops in the environment for each iteration.
+        drop_points (PathCollection) -- Scatter plot of raindrops in the 
+            environment for each iteration.
     """
     
-    fig.clear()
-    global carry_on
+    global last_frame
     
-    for agent in raindrops:
-        agent.move() # Move the raindrops downslope.
+    coords = None
+    while True:
+        try:
+            coords = frames.get_nowait()
+        except queue.Empty:
+            break
 
-    # Create stopping condition.
-    stop = all(land[agent.x][agent.y] == min_elev for agent in raindrops)
-    
-    # Model stops running if all raindrops reach a minimum elevation.
-    if stop is True:
-        carry_on = False
-        print("All raindrops have reached a point of minimum elevation.")
+    # Move the raindrops in the existing scatter plot.
+    if coords is not None:
+        drop_points.set_offsets(coords)
     
- 
-    plot_init() # Set up plot.
+    if recorder.enabled:
+        # Time between frames, including drawing and showing the last 
+        # frame, which are also timed on their own as 'draw' and 'blit'.
+        now = time.perf_counter()
+        if last_frame is not None:
+            recorder.count(frame_interval_ms = 
+                           round((now - last_frame) * 1000, 1))
+        last_frame = now
     
-    # Plot points of minimum elevation in the colour black.
-    matplotlib.pyplot.scatter(*zip(*min_coords), color = 'black')
-
-
-    for agent in raindrops:
-        # Plot all agents on a scatter graph in the colour blue.
-        matplotlib.pyplot.scatter(agent.y, agent.x, color = 'blue')
+    return drop_points,
 
 
 
 def gen_function(b = [0]):
     """
-    Stop creating frames when stopping condition is met.
+    Stop creating frames when the model has finished.
     
     Generator function that determines when frames should stop being 
-    created by checking whether the maximum number of iterations and/or 
-    the stopping condition has been met.
+    created by checking whether the model is still running or has 
+    coordinates left to show.
     """
     
+    global animating
+    
     a = 0
-    global carry_on
-    while (a < num_of_steps) & (carry_on):
+    while model_thread.is_alive() or not frames.empty():
         yield a # Return control and wait next call.
         a = a + 1
     
-    if carry_on == True:
-        print("Not all raindrops were able to reach a point of minimum \
-elevation. Stagnant or oscillating raindrops have reached a sink in the \
-landscape.")
-        
-    print("End of model run.")
+    animating = False
+
+
+
+def set_menu_state(state):
+    """
+    Enable or disable menu options in the GUI.
+    
+    Args:
+        state (str) -- State of the model: "ready", "running" or 
+            "finished".
+    """
+    
+    # Menu options are found by their labels rather than their position, 
+    # as some platforms add an extra (tear-off) entry to the menu.
+    # The following code is altered from that at:
+    # http://code.activestate.com/lists/python-tkinter-discuss/204/
+    finished = "normal" if state == "finished" else "disabled"
+    model_menu.entryconfig("Calculate...", state = finished)
+    model_menu.entryconfig("Drainage network", state = finished)
+    model_menu.entryconfig("Run model", state = "normal" if state == "ready" 
+                           else "disabled")
+
+
+
+def check_model():
+    """
+    Update the status bar and the menu options in the GUI.
+    
+    Checks the model thread every 100 ms, from the GUI thread, and 
+    enables the menu options when the model has finished. The status bar 
+    is refreshed until the animation has shown its last frame, which can 
+    be after the model has finished.
+    """
+    
+    if recorder.enabled:
+        status.config(text = recorder.status())
+    
+    if not model_thread.is_alive():
+        set_menu_state("finished")
+    
+    if model_thread.is_alive() or animating:
+        root.after(100, check_model)
 
 
 
 def run():
     """
-    Run the animation.
+    Run the model and the animation.
     
-    Run the animation, using the generator function to determine the 
-    number of frames. Provide enable/disable condition for menu options 
-    in the GUI.
+    Start the model in a separate thread and run the animation, using 
+    the generator function to determine the number of frames. The GUI 
+    stays responsive while the model runs. Provide enable/disable 
+    condition for menu options in the GUI.
     
     Returns:
         animation -- Animates the model.
     """
     
+    global animation, model_thread, animating
+    
+    import matplotlib.animation
+    
+    set_menu_state("running")
+    animating = True
+    
+    model_thread = threading.Thread(target = run_model, daemon = True)
+    model_thread.start()
+    
+    # Only the raindrops are redrawn in each frame (blitting).
     animation = matplotlib.animation.FuncAnimation(fig, update, repeat = False,
-                                                   frames = gen_function)
+                                                   frames = gen_function, 
+                                                   init_func = animation_init,
+                                                   blit = True, 
+                                                   cache_frame_data = False)
     # Number of frames in animation determined by generator function.
     
     canvas.show() # Show animation in matplotlib canvas.
     
-    # Provide conditions for enabling/disabling menu options in the GUI.
-    # The following code is altered from that at:
-    # http://code.activestate.com/lists/python-tkinter-discuss/204/
-    if model_menu.entrycget(0, "state") == "normal":
-        model_menu.entryconfig("Calculate...", state = "disabled")
-        model_menu.entryconfig("Run model", state = "normal")
-        model_menu.entryconfig("Drainage network", state = "disabled")
-    else:
-        model_menu.entryconfig("Calculate...", state = "normal")
-        model_menu.entryconfig("Run model", state = "disabled")
-        model_menu.entryconfig("Drainage network", state = "normal")
+    # Enable the other menu options once the model has finished.
+    check_model()
      
 
 
@@ -236,39 +499,65 @@ def volume():
     Calculate volume of water that has reached an outlet point.
     
     Calculate the number of raindrops and total volume of water that has 
-    reached an outlet point in cm**3. Append this total, the number of 
-    raindrops contributing to this total, the total number of raindrops 
-    used in the model run, and the radius of the raindrops to a .csv 
-    file.
+    reached an outlet point in cm**3, and the volume of water at each 
+    outlet point. Add these volumes, the number of raindrops 
+    contributing to the total, the total number of raindrops used in the 
+    model run, the radius of the raindrops, the seed and the number of 
+    iterations run to the results store.
     
     Returns:
         total_vol (float) -- Total volume of water that has reached an 
             outlet point.
-        outlet_vol (.csv) -- File containing calculated total and
-            parameters.
+        vols (array) -- Volume of water at each outlet point.
+        results -- Directory of results, with the calculated volumes 
+            and parameters added.
     """
     
-    outlet = [] # Make empty list.
-    
-    for agent in raindrops:
-        for i in range(len(min_coords)):
-            # Find raindrops with same coordinates as minimum elevation.
-            if agent.y == min_coords[i][0] and agent.x == min_coords[i][1]:
-                # Append these coordinates to a list.
-                outlet.append(agent)
+    import outlets
     
-    # Calculate volume of water that has reached a minimum elevation.
-    total_vol = (4/3) * 3.14159 * (radius**3) * len(outlet)
-    # Assumes all the raindrops are spherical with equal radii.
+    with recorder.phase('volume'):
+        # Raindrops are counted at their outlet point as they reach it.
+        num_at_outlet = int(batch.outlet_counts.sum())
+        
+        # Calculate volume of water that has reached a minimum elevation.
+        total_vol = outlets.drop_volume(radius) * num_at_outlet
+        vols = outlets.drop_volume(radius) * batch.outlet_counts
+        # Assumes all the raindrops are spherical with equal radii.
     
     vol = "%.2f" % total_vol # Total volume to 2 d.p.
     
     print("Volume of water that reached an outlet = " + str(vol) + " cm^3")
     
-    # Append total volume and parameters to file 'outlet_vol.csv'.
-    with open('outlet_vol.csv', 'a') as f1:
-        f1.write(str(total_vol) + "," + str(len(outlet)) + "," + 
-                 str(num_of_drops) + "," + str(radius) + "\n")
+    # Print the volume of water at each outlet point that has water.
+    for x, y, v in zip(outlet_points.x, outlet_points.y, vols):
+        if v > 0:
+            print("Volume of water at outlet (" + str(x) + ", " + str(y) + 
+                  ") = " + "%.2f" % v + " cm^3")
+    
+    # Add the volumes and parameters to the results store. The run is
+    # written to its own file, so it is never left half written.
+    store.add(seed, land_hash, steps_run, num_of_drops, radius, total_vol,
+              num_at_outlet, vols)
+    store.flush()
+
+
+
+def network_counts():
+    """
+    Get the counts of raindrops moving onto each pixel for plotting.
+    
+    Returns:
+        Counts from the model run, or from the flow accumulation of every 
+            pixel if 'use_flow_accumulation' is True.
+    """
+    
+    if use_flow_accumulation:
+        import drainage
+        
+        # As if one raindrop were placed on every pixel.
+        return drainage.network(receivers, length)
+    
+    return all_drops
 
 
 
@@ -282,10 +571,15 @@ def all_network():
             iterations of the model.
     """
     
+    import matplotlib.pyplot
+    
     plot_init() # Set up plot.
 
+    with recorder.phase('all_network'):
+        coords = network_counts().coords()
+
     # Plot all raindrop coordinates across all iterations in red.    
-    matplotlib.pyplot.scatter(*zip(*all_drops), color = 'red')
+    matplotlib.pyplot.scatter(*coords, color = 'red')
     matplotlib.pyplot.show()
     
     
@@ -294,72 +588,164 @@ def common_network():
     """
     Plot coordinates where 3 or more raindrops have moved through.
     
+    The number of raindrops needed is set by 'common_threshold'.
+    
     Returns:
         Scatter plot showing coordinates on the landscape where 3 or
             more raindrops have moved through.
     """
     
-    # Find coordinates that 3 or more raindrops have moved through.
-    # Create list of these coordinates.
-    # The following code is altered from that at:
-    # https://stackoverflow.com/questions/9835762/
-    duplicates = set([x for x in all_drops if all_drops.count(x) >= 3])
+    import matplotlib.pyplot
+    
+    # Find coordinates that 3 or more raindrops have moved through from
+    # the counts for each pixel.
+    with recorder.phase('common_network'):
+        duplicates = network_counts().coords(common_threshold)
     
     plot_init() # Set up plot.
     
-    matplotlib.pyplot.scatter(*zip(*duplicates), color = 'yellow')
+    matplotlib.pyplot.scatter(*duplicates, color = 'yellow')
+    matplotlib.pyplot.show()
+    
+    
+    
+def watershed_map():
+    """
+    Plot the watersheds of the landscape.
+    
+    Label each pixel with the sink or outlet point it drains into, found 
+    from the flow-direction grid rather than the model run.
+    
+    Returns:
+        Plot showing each watershed in a different colour.
+    """
+    
+    import matplotlib.pyplot
+    import drainage
+    
+    labels = drainage.watersheds(receivers, length)
+    
+    ax.clear() # Remove anything plotted before.
+    ax.set_ylim(0, length) # Set limit of y axis.
+    ax.set_xlim(0, length) # Set limit of x axis.
+    ax.imshow(labels, cmap = 'tab20')
     matplotlib.pyplot.show()
     
     
+def save_trace():
+    """
+    Save the phase times and counters recorded so far.
+    
+    Returns:
+        trace (.json) -- Chrome trace file, which can be opened in 
+            chrome://tracing or Perfetto.
+    """
+    
+    recorder.write_trace('trace.json')
+    
+    for name, (calls, seconds) in recorder.totals().items():
+        print(name + ": " + str(calls) + " calls, " + "%.3f" % seconds + 
+              " s")
+    
+    
    
-# Create GUI. 
-# GUI created with help from the code found at:
-# http://code.activestate.com/lists/python-tkinter-discuss/204/  
- 
-root = tkinter.Tk() # Build the main GUI window.
-
-root.wm_title("Project") # Set the main window title.
-
-# Create a matplotlib canvas embedded within the GUI window.
-canvas = matplotlib.backends.backend_tkagg.FigureCanvasTkAgg(fig, master = 
-                                                             root)
-canvas._tkcanvas.pack(side = tkinter.TOP, fill = tkinter.BOTH, expand = 1)
-
-# Create a menu.
-menu_bar = tkinter.Menu(root)
-
-root.config(menu = menu_bar)
-
-model_menu = tkinter.Menu(menu_bar)
-
-# Create sub-menus.
-sub_menu = tkinter.Menu(model_menu)
-
-sub_menu_2 = tkinter.Menu(model_menu)
-
-menu_bar.add_cascade(label = "Project", menu = model_menu)
-
-# Provide user with the option to calculate parameters.
-model_menu.add_cascade(label = "Calculate...", menu = sub_menu, state = 
-                       "disabled")
+def build_gui():
+    """
+    Create the GUI.
+    
+    Create the main window, with a matplotlib canvas for the animation 
+    and plots, and the menu.
+    """
+    
+    global fig, ax, root, canvas, status, model_menu
+    
+    import matplotlib.pyplot
+    import tkinter
+    import matplotlib.backends.backend_tkagg
+    
+    # Set up the figure for later use in the animation.
+    fig = matplotlib.pyplot.figure(figsize = (7, 7))
+    ax = fig.add_axes([0, 0, 1, 1])
+    
+    # Create GUI.
+    # GUI created with help from the code found at:
+    # http://code.activestate.com/lists/python-tkinter-discuss/204/
+    
+    root = tkinter.Tk() # Build the main GUI window.
+    
+    root.wm_title("Project") # Set the main window title.
+    
+    # Create a matplotlib canvas embedded within the GUI window.
+    canvas = matplotlib.backends.backend_tkagg.FigureCanvasTkAgg(fig, master =
+                                                                 root)
+    canvas._tkcanvas.pack(side = tkinter.TOP, fill = tkinter.BOTH, expand = 1)
+    
+    # Time showing each frame of the animation on the screen.
+    canvas.blit = recorder.timed('blit', canvas.blit)
+    
+    # Create a status bar showing the latest phase times and counters.
+    if instrument_run:
+        status = tkinter.Label(root, anchor = tkinter.W)
+        status.pack(side = tkinter.BOTTOM, fill = tkinter.X)
+    
+    # Create a menu.
+    menu_bar = tkinter.Menu(root)
+    
+    root.config(menu = menu_bar)
+    
+    model_menu = tkinter.Menu(menu_bar)
+    
+    # Create sub-menus.
+    sub_menu = tkinter.Menu(model_menu)
+    
+    sub_menu_2 = tkinter.Menu(model_menu)
+    
+    menu_bar.add_cascade(label = "Project", menu = model_menu)
+    
+    # Provide user with the option to calculate parameters.
+    model_menu.add_cascade(label = "Calculate...", menu = sub_menu, state =
+                           "disabled")
+    
+    # Provide user with the option to calculate the total water volume.
+    sub_menu.add_command(label = "Water volume", command = volume)
+    
+    # Provide user with the option to view drainage networks.
+    model_menu.add_cascade(label = "Drainage network", menu = sub_menu_2, 
+                           state = "disabled")
+    
+    # Provide user with the option to show the whole drainage network.
+    sub_menu_2.add_command(label = "Show whole network", command = all_network)
+    
+    # Provide user with the option to show the common drainage network.
+    sub_menu_2.add_command(label = "Show common network", 
+                           command = common_network)
+    
+    # Provide user with the option to show the watersheds.
+    sub_menu_2.add_command(label = "Show watersheds", command = watershed_map)
+    
+    # Provide user with the option to run the model.
+    model_menu.add_command(label = "Run model", command = run)
+    
+    # Provide user with the option to save the phase times and counters.
+    if instrument_run:
+        model_menu.add_command(label = "Save profile trace", command =
+                               save_trace)
+    
+    # Provide user with the option to exit the program.
+    model_menu.add_command(label = "Exit", command = root.quit)
 
-# Provide user with the option to calculate the total water volume.
-sub_menu.add_command(label = "Water volume", command = volume)
 
-# Provide user with the option to view drainage networks.
-model_menu.add_cascade(label = "Drainage network", menu = sub_menu_2, state = 
-                       "disabled")
 
-# Provide user with the option to show the whole drainage network.
-sub_menu_2.add_command(label = "Show whole network", command = all_network)
+def main():
+    """
+    Set up and run the model and the GUI.
+    """
+    
+    setup_model()
+    build_gui()
+    root.mainloop() # Set the GUI to wait for events.
 
-# Provide user with the option to show the common drainage network.
-sub_menu_2.add_command(label = "Show common network", command = common_network)
 
-# Provide user with the option to run the model.
-model_menu.add_command(label = "Run model", command = run)
 
-# Provide user with the option to exit the program.
-model_menu.add_command(label = "Exit", command = root.quit)
-  
-tkinter.mainloop() # Set the GUI to wait for events.
+if __name__ == '__main__':
+    main()
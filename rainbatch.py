@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:17:26 2026
+
+@author: agent
+
+Move many raindrops downslope at once.
+
+Hold the coordinates of all raindrops in NumPy arrays and move every
+raindrop with a single vectorised step, rather than calling Rain.move()
+once per raindrop. Each step is a lookup into the flow-direction grid
+built by flowgrid.receivers(), which follows the same rules as
+Rain.move().
+"""
+
+import numpy
+import flowgrid
+import multires
+
+
+class RainBatch():
+    """
+    Set up and provide methods for a batch of raindrops.
+
+    Store the coordinates of the raindrops as arrays and move them all
+    downslope together.
+
+    __init__ -- Set up batch coordinates and flow-direction grid.
+    random -- Set up a batch of randomly placed raindrops.
+    move -- Move all raindrops downslope by one step.
+    advance -- Move all raindrops downslope by many steps at once.
+    route -- Move all raindrops many steps, a block of pixels at a time.
+    num_active -- Get the number of raindrops that are still moving.
+    activate -- Return a raindrop to the set of moving raindrops.
+    place -- Give a single raindrop new coordinates.
+    __len__ -- Get the number of raindrops.
+    __getitem__ -- Get a view of a single raindrop.
+    """
+
+    def __init__(self, land, length, x, y, receivers = None, outlets = None):
+        """
+        Set up batch coordinates and flow-direction grid.
+
+        Args:
+            land (list) -- Environment coordinate list.
+            length (int) -- Size of the environment to be used.
+            x (list) -- Raindrop x-coordinates.
+            y (list) -- Raindrop y-coordinates.
+            receivers (array) -- Optional flow-direction grid from
+                flowgrid.receivers(). Built from 'land' if not given.
+            outlets (Outlets) -- Optional outlet points from
+                outlets.Outlets(). Raindrops that reach an outlet point
+                stop moving and are counted in self.outlet_counts.
+        """
+
+        self.land = land
+        self.length = length
+        self.outlets = outlets
+
+        if receivers is None:
+            receivers = flowgrid.receivers(land, length)
+        self.receivers = numpy.asarray(receivers, dtype = numpy.intp)
+
+        self.x = numpy.array(x, dtype = numpy.intp)
+        self.y = numpy.array(y, dtype = numpy.intp)
+
+        # Indices of the raindrops that are still moving. Raindrops that
+        # stop on a sink are removed, as they will never move again, as
+        # are raindrops that reach an outlet point.
+        self.active = numpy.arange(len(self.x))
+
+        if outlets is not None:
+            # Number of raindrops that have stopped at each outlet point.
+            self.outlet_counts = numpy.zeros(len(outlets), dtype = numpy.intp)
+            self._retire()
+
+
+    @classmethod
+    def random(cls, land, length, num_of_drops, seed = None, density = None,
+               receivers = None, outlets = None):
+        """
+        Set up a batch of randomly placed raindrops.
+
+        Args:
+            land (list) -- Environment coordinate list.
+            length (int) -- Size of the environment to be used.
+            num_of_drops (int) -- Number of raindrops.
+            seed (int) -- Seed or numpy.random.Generator, see
+                random_positions().
+            density (array) -- Optional rainfall density map, see
+                random_positions().
+            receivers (array) -- Optional flow-direction grid.
+            outlets (Outlets) -- Optional outlet points.
+
+        Returns:
+            batch (RainBatch) -- Batch of raindrops.
+        """
+
+        x, y = random_positions(length, num_of_drops, seed, density)
+
+        return cls(land, length, x, y, receivers, outlets)
+
+
+    def move(self, all_drops = None):
+        """
+        Move all raindrops downslope by one step.
+
+        Only raindrops that are still moving are looked at. Raindrops
+        that do not move are on a sink and are removed from the set of
+        moving raindrops, so each step gets quicker as the model runs.
+
+        Args:
+            all_drops (list) -- Optional list of all raindrop coordinates
+                across all iterations of the model. New coordinates are
+                appended as (y, x), as in Rain.move(). A
+                pathlog.VisitRaster can be used instead.
+
+        Returns:
+            moved (array) -- Indices of the raindrops that moved.
+        """
+
+        n = self.length + 1
+
+        # Look up the next pixel for every moving raindrop. Raindrops on
+        # a sink receive their own pixel and so do not move.
+        cells = self.x[self.active] * n + self.y[self.active]
+        new_cells = self.receivers[cells]
+        moves = new_cells != cells
+        moved = self.active[moves]
+        self.x[moved], self.y[moved] = numpy.divmod(new_cells[moves], n)
+        self.active = moved
+
+        if self.outlets is not None:
+            self._retire()
+
+        if all_drops is None:
+            pass
+        elif hasattr(all_drops, 'record'):
+            # Record all steps at once, e.g. in a pathlog.VisitRaster.
+            all_drops.record(self.x[moved], self.y[moved])
+        else:
+            all_drops.extend(zip(self.y[moved].tolist(),
+                                 self.x[moved].tolist()))
+
+        return moved
+
+
+    def advance(self, steps = None, all_drops = None):
+        """
+        Move all raindrops downslope by many steps at once.
+
+        Gives the same coordinates as calling move() 'steps' times, but
+        uses a flowgrid.JumpTable so the work grows with the number of
+        binary digits of 'steps' rather than with 'steps'. The table is
+        built on first use and kept for later calls.
+
+        Args:
+            steps (int) -- Number of steps. If not given, raindrops are
+                moved until every one has reached a sink, an outlet point
+                or a group of pixels it moves around forever, taking
+                flowgrid.JumpTable.end_steps steps.
+            all_drops (VisitRaster) -- Optional pathlog.VisitRaster to
+                record the number of moves onto each pixel. A list of
+                coordinates cannot be used, as the order of the moves
+                is not known.
+        """
+
+        n = self.length + 1
+
+        if all_drops is not None and not hasattr(all_drops, 'add'):
+            raise ValueError("Use a pathlog.VisitRaster to record the "
+                             "paths of raindrops moved many steps at once.")
+
+        jumps = getattr(self, '_jumps', None)
+        if jumps is None or (jumps.end_steps is None if steps is None else
+                             steps >= 2 ** len(jumps.tables)):
+            stops = None
+            if self.outlets is not None:
+                stops = self.outlets.index.ravel() >= 0
+            self._jumps = flowgrid.JumpTable(self.receivers, steps, stops)
+        if steps is None:
+            steps = self._jumps.end_steps
+
+        cells = self.x[self.active] * n + self.y[self.active]
+
+        if all_drops is not None:
+            all_drops.add(self._jumps.visits(cells, steps).reshape(n, n))
+
+        new_cells = self._jumps.advance(cells, steps)
+        self.x[self.active], self.y[self.active] = numpy.divmod(new_cells, n)
+
+        # Raindrops that are now on a sink will not move again.
+        if self.outlets is not None:
+            self._retire()
+        cells = self.x[self.active] * n + self.y[self.active]
+        self.active = self.active[self.receivers[cells] != cells]
+
+
+    def route(self, steps = None, levels = None):
+        """
+        Move all raindrops many steps, a block of pixels at a time.
+
+        Gives the same coordinates as advance(), using a
+        multires.BlockRouter so raindrops cross whole blocks of pixels
+        in one lookup. The exit tables are built on first use and kept
+        for later calls. The paths of the raindrops are not recorded.
+        It is slower than advance(), mostly in building the tables.
+
+        Args:
+            steps (int) -- Number of steps. If not given, raindrops are
+                moved the same number of steps as by advance().
+            levels (int) -- Number of block sizes, see
+                multires.BlockRouter.
+        """
+
+        n = self.length + 1
+
+        if getattr(self, '_router', None) is None or \
+        (levels is not None and levels != self._router.levels):
+            stops = None
+            if self.outlets is not None:
+                stops = self.outlets.index.ravel() >= 0
+            self._router = multires.BlockRouter(self.land, self.length,
+                                                self.receivers, stops,
+                                                levels)
+
+        cells = self.x[self.active] * n + self.y[self.active]
+        new_cells = self._router.route(cells, steps)
+        self.x[self.active], self.y[self.active] = numpy.divmod(new_cells, n)
+
+        # Raindrops that are now on a sink will not move again.
+        if self.outlets is not None:
+            self._retire()
+        cells = self.x[self.active] * n + self.y[self.active]
+        self.active = self.active[self.receivers[cells] != cells]
+
+
+    def _retire(self):
+        """
+        Stop moving raindrops that have reached an outlet point.
+
+        Each raindrop is counted at its outlet point once, when it stops.
+        """
+
+        index = self.outlets.index[self.x[self.active], self.y[self.active]]
+        at_outlet = index >= 0
+        self.outlet_counts += numpy.bincount(index[at_outlet],
+                                             minlength = len(self.outlets))
+        self.active = self.active[~at_outlet]
+
+
+    @property
+    def num_active(self):
+        """
+        Get the number of raindrops that are still moving.
+
+        Returns:
+            The number of raindrops that are still moving.
+        """
+
+        return len(self.active)
+
+
+    def activate(self, index):
+        """
+        Return a raindrop to the set of moving raindrops.
+
+        Must be called before a raindrop that has stopped is given new
+        coordinates. If it stopped at an outlet point, it is no longer
+        counted there.
+
+        Args:
+            index (int) -- Position of the raindrop in the batch.
+        """
+
+        # The moving raindrops are kept in order of index, so the
+        # raindrop is found with a binary search.
+        i = int(numpy.searchsorted(self.active, index))
+        if i < len(self.active) and self.active[i] == index:
+            return
+
+        if self.outlets is not None:
+            # Only raindrops that reach an outlet point stop on one, and
+            # each was counted there when it stopped.
+            outlet = self.outlets.index[self.x[index], self.y[index]]
+            if outlet >= 0:
+                self.outlet_counts[outlet] -= 1
+
+        self.active = numpy.insert(self.active, i, index)
+
+
+    def place(self, index, x, y):
+        """
+        Give a single raindrop new coordinates.
+
+        The raindrop moves again from its new coordinates, unless they
+        are an outlet point, where it is stopped and counted.
+
+        Args:
+            index (int) -- Position of the raindrop in the batch.
+            x (int) -- New x-coordinate.
+            y (int) -- New y-coordinate.
+        """
+
+        self.activate(index)
+        self.x[index] = x
+        self.y[index] = y
+
+        if self.outlets is not None:
+            outlet = self.outlets.index[self.x[index], self.y[index]]
+            if outlet >= 0:
+                self.outlet_counts[outlet] += 1
+                i = int(numpy.searchsorted(self.active, index))
+                self.active = numpy.delete(self.active, i)
+
+
+    def __len__(self):
+        """
+        Get the number of raindrops.
+        """
+
+        return len(self.x)
+
+
+    def __getitem__(self, index):
+        """
+        Get a view of a single raindrop.
+
+        Args:
+            index (int) -- Position of the raindrop in the batch.
+
+        Returns:
+            drop (RainView) -- View of the raindrop's coordinates.
+        """
+
+        if not -len(self) <= index < len(self):
+            raise IndexError("Raindrop index out of range.")
+
+        return RainView(self, index % len(self))
+
+
+
+class RainView():
+    """
+    View of a single raindrop in a batch.
+
+    Provides the same x and y property attributes as a Rain agent, but
+    reads and writes the coordinates held in the batch arrays, so the
+    view never needs to be updated after the batch moves. Only the batch
+    and an index are stored for each view.
+
+    __init__ -- Set up the view.
+    getx -- Get the x-coordinate of the raindrop.
+    setx -- Set the x-coordinate of the raindrop.
+    gety -- Get the y-coordinate of the raindrop.
+    sety -- Set the y-coordinate of the raindrop.
+    set_position -- Set both coordinates of the raindrop.
+    """
+
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch, index):
+        """
+        Set up the view.
+
+        Args:
+            batch (RainBatch) -- Batch holding the raindrop.
+            index (int) -- Position of the raindrop in the batch.
+        """
+
+        self.batch = batch
+        self.index = index
+
+
+    def getx(self):
+        """
+        Get the x-coordinate of the raindrop.
+
+        Returns:
+            The x-coordinate of the raindrop.
+        """
+
+        return int(self.batch.x[self.index])
+
+
+    def setx(self, value):
+        """
+        Set the x-coordinate of the raindrop.
+
+        Args:
+            value -- An integer.
+        """
+
+        self.batch.place(self.index, value, self.batch.y[self.index])
+
+
+    x = property(getx, setx)
+
+
+    def gety(self):
+        """
+        Get the y-coordinate of the raindrop.
+
+        Returns:
+            The y-coordinate of the raindrop.
+        """
+
+        return int(self.batch.y[self.index])
+
+
+    def sety(self, value):
+        """
+        Set the y-coordinate of the raindrop.
+
+        Args:
+            value -- An integer.
+        """
+
+        self.batch.place(self.index, self.batch.x[self.index], value)
+
+
+    y = property(gety, sety)
+
+
+    def set_position(self, x, y):
+        """
+        Set both coordinates of the raindrop.
+
+        Quicker than setting x and then y, and the raindrop is only
+        checked for an outlet point at its new coordinates.
+
+        Args:
+            x (int) -- New x-coordinate.
+            y (int) -- New y-coordinate.
+        """
+
+        self.batch.place(self.index, x, y)
+
+
+
+def random_positions(length, num_of_drops, seed = None, density = None):
+    """
+    Place raindrops randomly in the environment.
+
+    All coordinates are drawn at once. Without a density map every pixel
+    is equally likely, as in Rain.__init__(). With a density map, each
+    pixel is chosen in proportion to its value, e.g. to model heavier
+    rainfall in part of the landscape.
+
+    Each seed gives its own, independent stream of random numbers, so
+    runs with different seeds (e.g. counting up from 0) can be split
+    across processes.
+
+    Args:
+        length (int) -- Size of the environment to be used.
+        num_of_drops (int) -- Number of raindrops.
+        seed (int) -- Seed for the random placement of raindrops, or a
+            numpy.random.Generator to draw from.
+        density (array) -- Optional rainfall density map of
+            non-negative values, indexed [x, y] like 'land'.
+
+    Returns:
+        x (array) -- Raindrop x-coordinates.
+        y (array) -- Raindrop y-coordinates.
+    """
+
+    rng = numpy.random.default_rng(seed)
+    n = length + 1
+
+    if density is None:
+        y = rng.integers(0, n, num_of_drops)
+        x = rng.integers(0, n, num_of_drops)
+        return x, y
+
+    weights = numpy.asarray(density, dtype = float)[:n, :n].ravel()
+    if weights.size != n * n:
+        raise ValueError("Density map must cover the environment to be "
+                         "used.")
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("Density map must be non-negative and not all "
+                         "zero.")
+
+    cells = rng.choice(n * n, num_of_drops, p = weights / weights.sum())
+
+    return numpy.divmod(cells, n)
@@ -25,7 +25,13 @@ class Rain():
     move -- Move the agents downslope.
     """
     
-    def __init__(self, land, raindrops, all_drops, length, x, y):
+    # Fix the attributes of each agent so no per-agent dictionary is 
+    # created. This greatly reduces the memory used by many agents.
+    __slots__ = ('length', '_x', '_y', 'land', 'raindrops', 'all_drops', 
+                 'receivers')
+    
+    def __init__(self, land, raindrops, all_drops, length, x, y, 
+                 receivers = None, rng = None):
         """
         Set up agent coordinates.
         
@@ -36,20 +42,31 @@ class Rain():
             land (list) -- Environment coordinate list.
             raindrops (list) -- Agent coordinate list.
             all_drops (list) -- List of all raindrop coordinates across 
-                all iterations of the model.
+                all iterations of the model, or a pathlog.VisitRaster 
+                counting the steps onto each pixel.
             length (int) -- Size of the environment to be used.
             y (int) -- Agent y-coordinate.
             x (int) -- Agent x-coordinate.
+            receivers (list) -- Optional flow-direction grid from 
+                flowgrid.receivers(). If given, the agent is moved by 
+                looking up its next position in the grid.
+            rng (random.Random) -- Optional random number generator 
+                used to place the agent. Defaults to the global 
+                generator in the 'random' module.
         """
         
         # Allow raindrops to access the size of the environment.
         self.length = length
         
+        # Use a seeded generator, if given, so runs can be repeated.
+        if rng is None:
+            rng = random
+        
         # Set up y-coordinate to be a random integer 0 - 99.
-        self._y = random.randint(0, length)
+        self._y = rng.randint(0, length)
         
         # Set up x-coordinate to be a random integer 0 - 99.
-        self._x = random.randint(0, length)
+        self._x = rng.randint(0, length)
         
         # Create a boundary condition for the rain, so it can't flow out
         # of the environment.
@@ -73,6 +90,9 @@ class Rain():
         
         # Allow raindrops to access all raindrops data.
         self.all_drops = all_drops
+        
+        # Allow raindrops to access the flow-direction grid.
+        self.receivers = receivers
 
         
     # Implement a property attribute for x.
@@ -147,6 +167,19 @@ class Rain():
             x (int) -- New x-coordinate.
         """
         
+        if self.receivers is not None:
+            # Look up the next position in the flow-direction grid.
+            cell = self._x * (self.length + 1) + self._y
+            new_cell = self.receivers[cell]
+            
+            # If the agent is not on a sink:
+            if new_cell != cell:
+                # Move agent to its next position.
+                self._x, self._y = divmod(new_cell, self.length + 1)
+                # Append the new coordinate to list 'all_drops'.
+                self.all_drops.append((self._y, self._x))
+            return
+        
         # Multiple 'if' statements are required to resolve issues with
         # index ranges.
         
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:33:40 2026
+
+@author: agent
+
+Store the results of model runs for later analysis.
+
+Results are kept in a directory of NumPy (.npz) files, one for each
+batch of runs, with a column (array) for each value rather than a line
+of text for each run. Each batch is written to a temporary file and
+then renamed, so a file is either complete or not there at all, and
+runs written at the same time by different processes never mix. Every
+run is recorded with its seed, a hash of the landscape, the number of
+iterations run and the volume of water at each outlet point, as well as
+the values written to 'outlet_vol.csv' previously.
+"""
+
+import hashlib
+import os
+import time
+import uuid
+import numpy
+
+
+# Columns with one value per run, and their data types.
+COLUMNS = {'run_id': 'U32', 'seed': numpy.int64, 'grid_hash': 'U16',
+           'steps': numpy.int64, 'num_of_drops': numpy.int64,
+           'radius': float, 'total_vol': float,
+           'outlet_drops': numpy.int64}
+
+
+
+def grid_hash(area):
+    """
+    Make a short hash identifying a landscape.
+
+    Args:
+        area (array) -- Elevations of the environment used.
+
+    Returns:
+        The first 16 hexadecimal digits of the SHA-1 hash.
+    """
+
+    area = numpy.ascontiguousarray(area, dtype = float)
+    h = hashlib.sha1(str(area.shape).encode())
+    h.update(area.tobytes())
+
+    return h.hexdigest()[:16]
+
+
+
+class ResultStore():
+    """
+    Set up and provide methods for a directory of model results.
+
+    __init__ -- Set up the store.
+    add -- Add the results of a run.
+    flush -- Write the runs added so far to a new file.
+    load -- Read all runs.
+    aggregate -- Summarise a column for groups of runs.
+    """
+
+    def __init__(self, path):
+        """
+        Set up the store.
+
+        Args:
+            path (str) -- Directory holding the results. Created if it
+                does not exist.
+        """
+
+        self.path = path
+        os.makedirs(path, exist_ok = True)
+        self._rows = []
+
+
+    def add(self, seed, grid, steps, num_of_drops, radius, total_vol,
+            outlet_drops, outlet_vols):
+        """
+        Add the results of a run.
+
+        Runs are kept in memory until flush() is called.
+
+        Args:
+            seed (int) -- Seed used to place the raindrops, or None.
+            grid (str) -- Hash of the landscape, from grid_hash().
+            steps (int) -- Number of iterations run.
+            num_of_drops (int) -- Number of raindrops.
+            radius (float) -- Radius of the raindrops.
+            total_vol (float) -- Total volume of water that has reached
+                an outlet point.
+            outlet_drops (int) -- Number of raindrops at an outlet point.
+            outlet_vols (array) -- Volume of water at each outlet point.
+
+        Returns:
+            run_id (str) -- Unique identifier of the run.
+        """
+
+        run_id = uuid.uuid4().hex
+        self._rows.append({'run_id': run_id,
+                           'seed': -1 if seed is None else seed,
+                           'grid_hash': grid, 'steps': steps,
+                           'num_of_drops': num_of_drops, 'radius': radius,
+                           'total_vol': total_vol,
+                           'outlet_drops': outlet_drops,
+                           'outlet_vols': numpy.asarray(outlet_vols,
+                                                        dtype = float)})
+
+        return run_id
+
+
+    def flush(self):
+        """
+        Write the runs added so far to a new file.
+
+        Returns:
+            name (str) -- Name of the file written, or None if there were
+                no runs to write.
+        """
+
+        if not self._rows:
+            return None
+
+        columns = {key: numpy.array([row[key] for row in self._rows],
+                                    dtype = dtype)
+                   for key, dtype in COLUMNS.items()}
+
+        # Volumes at each outlet point, for all runs one after another.
+        # The volumes of run i start at outlet_start[i].
+        vols = [row['outlet_vols'] for row in self._rows]
+        columns['outlet_vols'] = numpy.concatenate(vols)
+        columns['outlet_start'] = numpy.cumsum([0] + [len(v) for v in
+                                                      vols[:-1]])
+
+        # Files are named by the time they were written, so runs are read
+        # back in the order they were added.
+        name = os.path.join(self.path, 'runs_' + str(time.time_ns()) + '_' +
+                            uuid.uuid4().hex[:8] + '.npz')
+        with open(name + '.tmp', 'wb') as f:
+            numpy.savez_compressed(f, **columns)
+        os.replace(name + '.tmp', name)
+
+        self._rows = []
+
+        return name
+
+
+    def load(self, columns = None):
+        """
+        Read all runs.
+
+        Args:
+            columns (list) -- Names of the columns to read. Defaults to
+                all columns with one value per run.
+
+        Returns:
+            table (dict) -- Array of values for each column, one value
+                per run. If 'outlet_vols' is asked for, it is a list
+                with an array of volumes for each run.
+        """
+
+        if columns is None:
+            columns = list(COLUMNS)
+
+        parts = {key: [] for key in columns}
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith('.npz'):
+                continue
+            with numpy.load(os.path.join(self.path, name)) as data:
+                for key in columns:
+                    if key == 'outlet_vols':
+                        starts = data['outlet_start']
+                        parts[key].extend(numpy.split(data['outlet_vols'],
+                                                      starts[1:]))
+                    else:
+                        parts[key].append(data[key])
+
+        table = {}
+        for key in columns:
+            if key == 'outlet_vols':
+                table[key] = parts[key]
+            elif parts[key]:
+                table[key] = numpy.concatenate(parts[key])
+            else:
+                table[key] = numpy.array([], dtype = COLUMNS[key])
+
+        return table
+
+
+    def aggregate(self, value = 'total_vol', by = ('num_of_drops', 'radius'),
+                  where = None):
+        """
+        Summarise a column for groups of runs.
+
+        Args:
+            value (str) -- Column to summarise.
+            by (tuple) -- Columns to group the runs by. If empty, all
+                the runs are summarised as one group, with the key ().
+            where (dict) -- Optional values that runs must have to be
+                included, e.g. {'grid_hash': '...'}.
+
+        Returns:
+            summary (dict) -- For each group (a tuple of the values of
+                the 'by' columns): the number of runs and the mean,
+                standard deviation, minimum and maximum of 'value'.
+        """
+
+        where = where or {}
+        table = self.load(list(set(by) | set(where) | {value}))
+
+        keep = numpy.ones(len(table[value]), dtype = bool)
+        for key, wanted in where.items():
+            keep &= table[key] == wanted
+
+        values = table[value][keep].astype(float)
+        if by:
+            keys = list(zip(*(table[key][keep].tolist() for key in by)))
+        else:
+            # All the runs are in one group.
+            keys = [()] * len(values)
+        groups, index = _group(keys)
+
+        count = numpy.bincount(index, minlength = len(groups))
+        total = numpy.bincount(index, weights = values,
+                               minlength = len(groups))
+        mean = total / numpy.maximum(count, 1)
+
+        # Found from the differences from the mean, rather than the mean
+        # of the squares, which loses precision when the values are
+        # large compared with their spread.
+        squares = numpy.bincount(index, weights = (values - mean[index]) ** 2,
+                                 minlength = len(groups))
+        std = numpy.sqrt(squares / numpy.maximum(count, 1))
+        low = numpy.full(len(groups), numpy.inf)
+        high = numpy.full(len(groups), -numpy.inf)
+        numpy.minimum.at(low, index, values)
+        numpy.maximum.at(high, index, values)
+
+        return {group: {'count': int(count[i]), 'mean': float(mean[i]),
+                        'std': float(std[i]), 'min': float(low[i]),
+                        'max': float(high[i])}
+                for i, group in enumerate(groups)}
+
+
+
+def _group(keys):
+    """
+    Number the distinct keys.
+
+    Args:
+        keys (list) -- A tuple of values for each run.
+
+    Returns:
+        groups (list) -- Distinct keys, in sorted order.
+        index (array) -- Position of each run's key in 'groups'.
+    """
+
+    groups = sorted(set(keys))
+    position = {key: i for i, key in enumerate(groups)}
+
+    return groups, numpy.array([position[key] for key in keys],
+                               dtype = numpy.intp)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:18:41 2026
+
+@author: agent
+
+Run the raindrop model without a GUI.
+
+Place raindrops randomly, move them downslope until they all reach a
+point of minimum elevation or the maximum number of iterations is
+reached, and return the results as data rather than as an animation.
+No matplotlib or tkinter modules are imported, so the model can be run
+on machines without a display.
+
+Can be run from the command line, e.g.:
+
+    python simulate.py in.txt --drops 1000 --steps 100 --seed 1
+
+Args:
+    land (str) -- File containing environment data (.csv or .npy).
+    num_of_drops (int) -- Number of raindrops.
+    num_of_steps (int) -- Number of iterations.
+    radius (float) -- Radius of the raindrops.
+    seed (int) -- Seed for the random placement of raindrops.
+    length (int) -- Size of the environment to be used.
+
+Returns:
+    Final coordinates of the raindrops, the number of raindrops that
+        moved through each pixel, and the volume of water that has
+        reached an outlet point.
+"""
+
+import argparse
+import json
+import numpy
+import rainbatch
+import flowgrid
+import terrain
+import pathlog
+import outlets
+import instrument
+import checkpoint as checkpoints
+import results as store
+
+
+
+def simulate(land, num_of_drops, num_of_steps, radius, seed = None,
+             length = None, receivers = None, density = None, fill = False,
+             jump = False, route = False,
+             recorder = instrument.NULL_RECORDER, checkpoint = None,
+             checkpoint_every = 100, resume = None):
+    """
+    Run the model and return the results.
+
+    Raindrops are moved downslope until all of them have reached a point
+    of minimum elevation or 'num_of_steps' iterations have been run, as
+    in the animation in project.py.
+
+    Args:
+        land (list) -- Environment coordinate list or array.
+        num_of_drops (int) -- Number of raindrops.
+        num_of_steps (int) -- Number of iterations.
+        radius (float) -- Radius of the raindrops.
+        seed (int) -- Seed for the random placement of raindrops, or a
+            numpy.random.Generator to draw from.
+        length (int) -- Size of the environment to be used. Defaults to
+            the whole environment.
+        receivers (array) -- Optional flow-direction grid from
+            flowgrid.receivers(). Built from 'land' if not given.
+        density (array) -- Optional rainfall density map, indexed [x, y]
+            like 'land'. Raindrops are placed uniformly if not given.
+        fill (bool) -- Fill depressions in the landscape before building
+            the flow-direction grid, see terrain.fill_depressions().
+        jump (bool) -- Move the raindrops all 'num_of_steps' steps at
+            once with RainBatch.advance(), rather than one step at a
+            time. Gives the same results, except that 'steps' is always
+            'num_of_steps'.
+        route (bool) -- Move the raindrops all 'num_of_steps' steps at
+            once with RainBatch.route(), a block of pixels at a time.
+            Gives the same results as 'jump', except that the paths of
+            the raindrops are not recorded, so 'path_counts' is None.
+        recorder (instrument.Recorder) -- Optional recorder for the time
+            taken by each phase and the number of raindrops moving.
+        checkpoint (str) -- Optional name of a .npz file to save the
+            state of the run to, see checkpoint.py. Written in the
+            background every 'checkpoint_every' iterations and at the
+            end of the run.
+        checkpoint_every (int) -- Number of iterations between
+            checkpoints.
+        resume (str) -- Optional name of a checkpoint to carry on the
+            run from. Gives the same results as a run that was never
+            stopped, as long as the other arguments are the same.
+
+    Returns:
+        results (dict) -- Dictionary containing:
+            x, y (array) -- Final coordinates of the raindrops.
+            path_counts (array) -- Number of times a raindrop moved onto
+                each pixel, indexed [x, y] like 'land', or None if
+                'route' is True.
+            steps (int) -- Number of iterations run.
+            all_at_min (bool) -- Whether all raindrops reached a point of
+                minimum elevation.
+            outlet_drops (int) -- Number of raindrops at an outlet point.
+            total_vol (float) -- Total volume of water that has reached
+                an outlet point.
+            outlet_x, outlet_y (array) -- Coordinates of the outlet
+                points.
+            outlet_vols (array) -- Volume of water at each outlet point.
+    """
+
+    if length is None:
+        length = len(land) - 1
+
+    area = terrain.area(land, length)
+    outlet_points = outlets.Outlets(area)
+
+    # Count the number of times raindrops move onto each pixel. Routing
+    # does not follow the raindrops one pixel at a time, so cannot.
+    path_counts = None
+    if not route:
+        path_counts = pathlog.VisitRaster(length)
+
+    with recorder.phase('receivers'):
+        if receivers is None and fill:
+            receivers = flowgrid.receivers(
+                terrain.fill_depressions(land, length), length)
+        elif receivers is None:
+            receivers = flowgrid.receivers(land, length)
+
+    # Identify the landscape, so a run is only carried on from a
+    # checkpoint saved on the same landscape.
+    land_hash = None
+    if checkpoint is not None or resume is not None:
+        land_hash = store.grid_hash(area)
+
+    rng = numpy.random.default_rng(seed)
+    steps = 0
+    drop_steps = 0
+
+    if resume is None:
+        # Place all raindrops at once, holding their coordinates in
+        # arrays so they can be moved together. Raindrops stop moving
+        # when they reach an outlet point or a sink.
+        batch = rainbatch.RainBatch.random(land, length, num_of_drops, rng,
+                                           density, receivers, outlet_points)
+    else:
+        state = checkpoints.load(resume)
+        if state['values'].get('grid_hash') != land_hash:
+            raise ValueError(resume + " was saved from a run on a "
+                             "different landscape.")
+        batch = rainbatch.RainBatch(land, length, state['x'], state['y'],
+                                    receivers, outlet_points)
+        steps = checkpoints.restore(state, batch, rng, path_counts)
+        drop_steps = state['values'].get('drop_steps', 0)
+
+    writer = None
+    if checkpoint is not None:
+        writer = checkpoints.Checkpointer(checkpoint, checkpoint_every)
+
+    if route and steps < num_of_steps:
+        with recorder.phase('route'):
+            batch.route(num_of_steps - steps)
+        steps = num_of_steps
+    elif jump and steps < num_of_steps:
+        with recorder.phase('advance'):
+            batch.advance(num_of_steps - steps, path_counts)
+        steps = num_of_steps
+    while steps < num_of_steps and batch.num_active > 0:
+        active = batch.num_active
+        with recorder.phase('move'):
+            moved = batch.move(path_counts)
+        steps = steps + 1
+        if recorder.enabled:
+            # Raindrops that did not move have stalled on a sink.
+            drop_steps = drop_steps + active
+            recorder.count(step = steps, active = batch.num_active,
+                           drop_steps = drop_steps,
+                           stalled = active - len(moved))
+        if writer is not None:
+            writer.update(batch, steps, rng, path_counts,
+                          grid_hash = land_hash, drop_steps = drop_steps)
+
+    if writer is not None:
+        writer.save(batch, steps, rng, path_counts, grid_hash = land_hash,
+                    drop_steps = drop_steps)
+        writer.close()
+
+    # Find the volume of water at each outlet point.
+    counts = batch.outlet_counts
+    vols = counts * outlets.drop_volume(radius)
+    total_vol = outlets.drop_volume(radius) * int(counts.sum())
+    all_at_min = int(counts.sum()) == num_of_drops
+
+    if path_counts is not None:
+        path_counts = path_counts.counts
+
+    return {'x': batch.x, 'y': batch.y, 'path_counts': path_counts,
+            'steps': steps, 'all_at_min': all_at_min,
+            'outlet_drops': int(counts.sum()), 'total_vol': total_vol,
+            'outlet_x': outlet_points.x, 'outlet_y': outlet_points.y,
+            'outlet_vols': vols}
+
+
+
+def main(argv = None):
+    """
+    Run the model from the command line.
+
+    Args:
+        argv (list) -- Command line arguments. Defaults to sys.argv.
+    """
+
+    parser = argparse.ArgumentParser(description = "Run the raindrop model "
+                                     "without a GUI.")
+    parser.add_argument('land', help = "File containing environment data "
+                        "(.csv or .npy).")
+    parser.add_argument('--drops', type = int, default = 100,
+                        help = "Number of raindrops.")
+    parser.add_argument('--steps', type = int, default = 100,
+                        help = "Number of iterations.")
+    parser.add_argument('--radius', type = float, default = 0.3,
+                        help = "Radius of the raindrops.")
+    parser.add_argument('--seed', type = int, default = None,
+                        help = "Seed for the random placement of raindrops.")
+    parser.add_argument('--length', type = int, default = None,
+                        help = "Size of the environment to be used.")
+    parser.add_argument('--fill', action = 'store_true',
+                        help = "Fill depressions in the landscape first.")
+    parser.add_argument('--jump', action = 'store_true',
+                        help = "Move the raindrops all steps at once.")
+    parser.add_argument('--route', action = 'store_true',
+                        help = "Move the raindrops all steps at once, a "
+                        "block of pixels at a time.")
+    parser.add_argument('--output', default = None,
+                        help = "Write the results to this .json file.")
+    parser.add_argument('--trace', default = None,
+                        help = "Write the time taken by each phase to this "
+                        "Chrome trace (.json) file.")
+    parser.add_argument('--checkpoint', default = None,
+                        help = "Save the state of the run to this .npz "
+                        "file as it runs.")
+    parser.add_argument('--checkpoint-every', type = int, default = 100,
+                        help = "Number of iterations between checkpoints.")
+    parser.add_argument('--resume', default = None,
+                        help = "Carry on the run saved in this checkpoint "
+                        "(.npz) file.")
+    args = parser.parse_args(argv)
+
+    if args.trace is None:
+        recorder = instrument.NULL_RECORDER
+    else:
+        recorder = instrument.Recorder()
+
+    with recorder.phase('load'):
+        land = terrain.load_land(args.land)
+    results = simulate(land, args.drops, args.steps, args.radius, args.seed,
+                       args.length, fill = args.fill, jump = args.jump,
+                       route = args.route, recorder = recorder,
+                       checkpoint = args.checkpoint,
+                       checkpoint_every = args.checkpoint_every,
+                       resume = args.resume)
+
+    if results['all_at_min']:
+        print("All raindrops have reached a point of minimum elevation.")
+    else:
+        print("Not all raindrops were able to reach a point of minimum "
+              "elevation. Stagnant or oscillating raindrops have reached a "
+              "sink in the landscape.")
+
+    print("Volume of water that reached an outlet = " +
+          "%.2f" % results['total_vol'] + " cm^3")
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({key: (value.tolist() if hasattr(value, 'tolist')
+                             else value) for key, value in results.items()},
+                      f)
+
+    if args.trace is not None:
+        recorder.write_trace(args.trace)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:19:16 2026
+
+@author: agent
+
+Read in environment data.
+
+Reading a large .csv file of elevations into nested lists is slow and
+uses a lot of memory. Instead, the .csv file is converted once into a
+binary NumPy (.npy) file stored next to it, and later runs memory-map
+the binary file so that only the parts of the landscape that are used
+are read from disk. The array returned can be indexed as land[x][y],
+just like the nested lists.
+
+Statistics of the landscape needed at the start of a model run, such as
+the minimum elevation and the outlet points, are also found here and
+cached next to the environment data.
+"""
+
+import csv
+import heapq
+import math
+import os
+import numpy
+
+
+
+def binary_path(path):
+    """
+    Get the name of the binary file used for a .csv file.
+
+    Args:
+        path (str) -- Name of the .csv file.
+
+    Returns:
+        npy_path (str) -- Name of the .npy file, e.g. 'in.npy' for
+            'in.txt'.
+    """
+
+    return os.path.splitext(path)[0] + '.npy'
+
+
+
+def convert(path, npy_path = None, dtype = 'float64'):
+    """
+    Convert a .csv file of elevations into a binary .npy file.
+
+    The .csv file is read one row at a time, twice: once to find the
+    size of the landscape and once to write each row to the binary file.
+    This means files larger than the available memory can be converted.
+
+    Args:
+        path (str) -- Name of the .csv file.
+        npy_path (str) -- Name of the .npy file to write. Defaults to
+            binary_path(path).
+        dtype (str) -- Data type used to store the elevations.
+
+    Returns:
+        npy_path (str) -- Name of the .npy file written.
+    """
+
+    if npy_path is None:
+        npy_path = binary_path(path)
+
+    # Find the number of rows and columns.
+    rows = 0
+    cols = None
+    with open(path, newline = '') as f:
+        for row in csv.reader(f):
+            if cols is None:
+                cols = len(row)
+            elif len(row) != cols:
+                raise ValueError("Row " + str(rows + 1) + " of " + path +
+                                 " has " + str(len(row)) + " values, not " +
+                                 str(cols) + ".")
+            rows = rows + 1
+
+    if cols is None:
+        raise ValueError(path + " contains no data.")
+
+    # Write each row straight into the memory-mapped binary file. The
+    # file is written under a temporary name and then renamed, so an
+    # interrupted conversion never leaves a partial file behind.
+    tmp_path = npy_path + '.tmp'
+    out = numpy.lib.format.open_memmap(tmp_path, mode = 'w+', dtype = dtype,
+                                       shape = (rows, cols))
+    with open(path, newline = '') as f:
+        reader = csv.reader(f, quoting = csv.QUOTE_NONNUMERIC)
+        for i, row in enumerate(reader):
+            out[i] = row
+    out.flush()
+    del out
+    os.replace(tmp_path, npy_path)
+
+    return npy_path
+
+
+
+def load_land(path, mmap = True):
+    """
+    Read in environment data.
+
+    .npy files are loaded directly. For .csv files, the binary file made
+    by convert() is used if it is newer than the .csv file, otherwise the
+    .csv file is converted first.
+
+    Args:
+        path (str) -- Name of the .csv or .npy file.
+        mmap (bool) -- Memory-map the binary file rather than reading it
+            all into memory.
+
+    Returns:
+        land (array) -- Environment elevations, indexed land[x][y].
+    """
+
+    if path.endswith('.npy'):
+        npy_path = path
+    else:
+        npy_path = binary_path(path)
+        if not os.path.exists(npy_path) or \
+        os.path.getmtime(npy_path) < os.path.getmtime(path):
+            convert(path, npy_path)
+
+    return numpy.load(npy_path, mmap_mode = 'r' if mmap else None)
+
+
+
+def area(land, length):
+    """
+    Get the part of the environment to be used as an array.
+
+    Args:
+        land (list) -- Environment coordinate list or array.
+        length (int) -- Size of the environment to be used.
+
+    Returns:
+        area (array) -- Elevations from (0, 0) to (length, length).
+    """
+
+    n = length + 1
+
+    if isinstance(land, numpy.ndarray):
+        return numpy.asarray(land[:n, :n], dtype = float)
+
+    return numpy.array([row[:n] for row in land[:n]], dtype = float)
+
+
+
+def min_pyramid(land, length, levels):
+    """
+    Find the minimum elevation of blocks of pixels at coarser and
+    coarser resolutions.
+
+    Each level halves the resolution of the one before, taking the
+    lowest of each 2 x 2 block of pixels. Pixels outside the environment
+    are given an infinite elevation.
+
+    Args:
+        land (list) -- Environment coordinate list or array.
+        length (int) -- Size of the environment to be used.
+        levels (int) -- Number of levels.
+
+    Returns:
+        pyramid (list) -- Array for each level. pyramid[k - 1][i, j] is
+            the minimum elevation of the 2**k x 2**k block of pixels
+            starting at (i * 2**k, j * 2**k).
+    """
+
+    level = area(land, length)
+    pyramid = []
+    for k in range(levels):
+        rows = (level.shape[0] + 1) // 2
+        cols = (level.shape[1] + 1) // 2
+        padded = numpy.full((2 * rows, 2 * cols), numpy.inf)
+        padded[:level.shape[0], :level.shape[1]] = level
+        level = padded.reshape(rows, 2, cols, 2).min(axis = (1, 3))
+        pyramid.append(level)
+
+    return pyramid
+
+
+
+def stats_path(path):
+    """
+    Get the name of the file used to cache the statistics of a landscape.
+
+    Args:
+        path (str) -- Name of the .csv or .npy file.
+
+    Returns:
+        stats_path (str) -- Name of the .npz file, e.g. 'in.stats.npz'
+            for 'in.txt'.
+    """
+
+    return os.path.splitext(path)[0] + '.stats.npz'
+
+
+
+def stats(land, length, path = None):
+    """
+    Find the minimum elevation, outlet points and sinks of a landscape.
+
+    Outlet points are the pixels with the minimum elevation. Sinks are
+    pixels that are lower than all of their neighbours, where a raindrop
+    stops moving (see Rain.move()). Everything is found with whole-array
+    operations on the part of the environment to be used.
+
+    If 'path' is given, the results are cached in a file next to it and
+    read from that file on later runs, as long as the file with the
+    environment data has not changed.
+
+    Args:
+        land (list) -- Environment coordinate list or array.
+        length (int) -- Size of the environment to be used.
+        path (str) -- Name of the file the environment data was read
+            from.
+
+    Returns:
+        stats (dict) -- Dictionary containing:
+            min_elev (float) -- Minimum elevation.
+            outlet_x, outlet_y (array) -- Coordinates of the outlet
+                points.
+            sink_x, sink_y (array) -- Coordinates of the sinks.
+    """
+
+    if path is not None:
+        cache = stats_path(path)
+        mtime = os.path.getmtime(path)
+        if os.path.exists(cache):
+            with numpy.load(cache) as data:
+                if int(data['length']) == length and \
+                float(data['mtime']) == mtime:
+                    return {'min_elev': float(data['min_elev']),
+                            'outlet_x': data['outlet_x'],
+                            'outlet_y': data['outlet_y'],
+                            'sink_x': data['sink_x'],
+                            'sink_y': data['sink_y']}
+
+    elevs = area(land, length)
+    min_elev = float(elevs.min())
+    outlet_x, outlet_y = numpy.nonzero(elevs <= min_elev)
+
+    # Find the lowest of the 8 neighbours of every pixel. The border of
+    # infinite elevation stands in for pixels outside the environment.
+    n = length + 1
+    padded = numpy.pad(elevs, 1, mode = 'constant',
+                       constant_values = numpy.inf)
+    lowest = numpy.full(elevs.shape, numpy.inf)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if dx != 0 or dy != 0:
+                lowest = numpy.minimum(lowest, padded[1 + dx:n + 1 + dx,
+                                                      1 + dy:n + 1 + dy])
+    sink_x, sink_y = numpy.nonzero(elevs < lowest)
+
+    results = {'min_elev': min_elev, 'outlet_x': outlet_x,
+               'outlet_y': outlet_y, 'sink_x': sink_x, 'sink_y': sink_y}
+
+    if path is not None:
+        # Written under a temporary name and then renamed, so an
+        # interrupted run never leaves a partial file behind.
+        with open(cache + '.tmp', 'wb') as f:
+            numpy.savez(f, length = length, mtime = mtime, **results)
+        os.replace(cache + '.tmp', cache)
+
+    return results
+
+
+
+def fill_depressions(land, length, epsilon = True):
+    """
+    Fill the depressions in a landscape so every pixel drains to an outlet.
+
+    Uses a priority-flood: starting from the outlet points (the pixels of
+    minimum elevation), pixels are visited from lowest to highest using
+    a heap, and any pixel lower than the pixel it was reached from is
+    raised to that elevation. Raindrops then no longer stop in sinks on
+    the way to an outlet point.
+
+    If 'epsilon' is True, each pixel is also raised to just above the
+    pixel it was reached from (by the smallest step possible for a
+    float). This gives flat areas a small gradient towards the outlets,
+    so raindrops no longer move back and forth across them.
+
+    Depressions are only filled, not breached by cutting a channel
+    through the pixels around them. Pixels of equal elevation are visited
+    in order of x and then y, so across a flat the gradient leads back
+    towards the outlet point or spill point reached first in that order.
+
+    Args:
+        land (list) -- Environment coordinate list or array.
+        length (int) -- Size of the environment to be used.
+        epsilon (bool) -- Give filled and flat areas a small gradient.
+
+    Returns:
+        filled (array) -- Filled elevations from (0, 0) to
+            (length, length).
+    """
+
+    elevs = area(land, length)
+    n = length + 1
+    min_elev = float(elevs.min())
+
+    # Plain lists are much faster than arrays for visiting one pixel at
+    # a time. The landscape is given a border of pixels that are already
+    # closed, so the neighbours of a pixel are found by adding a fixed
+    # offset to its index, without checking the edges.
+    m = n + 2
+    padded = numpy.pad(elevs, 1, mode = 'constant',
+                       constant_values = numpy.inf)
+    filled = padded.ravel().tolist()
+    border = numpy.ones((m, m), dtype = numpy.uint8)
+    border[1:-1, 1:-1] = 0
+    closed = bytearray(border.tobytes())
+    offsets = (-m - 1, -m, -m + 1, -1, 1, m - 1, m, m + 1)
+
+    heap = []
+    for cell in numpy.nonzero(padded.ravel() <= min_elev)[0].tolist():
+        closed[cell] = 1
+        heap.append((min_elev, cell))
+    heapq.heapify(heap)
+
+    heappop = heapq.heappop
+    heappush = heapq.heappush
+    nextafter = math.nextafter
+    inf = math.inf
+    while heap:
+        elev, cell = heappop(heap)
+        if epsilon:
+            elev = nextafter(elev, inf)
+        for offset in offsets:
+            neighbour = cell + offset
+            if not closed[neighbour]:
+                closed[neighbour] = 1
+                if filled[neighbour] < elev:
+                    filled[neighbour] = elev
+                heappush(heap, (filled[neighbour], neighbour))
+
+    return numpy.array(filled).reshape(m, m)[1:-1, 1:-1].copy()
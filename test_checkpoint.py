@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 05:10:53 2026
+
+@author: agent
+
+Check that a model run carried on from a checkpoint gives the same
+results as one that was never stopped, and that errors writing a
+checkpoint are raised rather than stopping the run.
+
+Run with:
+
+    python -m pytest test_checkpoint.py
+"""
+
+import os
+import threading
+import numpy
+import pytest
+import checkpoint
+import pathlog
+import rainbatch
+import simulate
+
+
+
+def land():
+    """
+    Make a random landscape with flats, sinks and several outlet points.
+    """
+
+    rng = numpy.random.default_rng(4)
+
+    return rng.integers(0, 6, (61, 61)).astype(float)
+
+
+
+@pytest.mark.parametrize('mode', [{}, {'jump': True}, {'route': True}])
+def test_resume_matches_uninterrupted(tmp_path, mode):
+    path = str(tmp_path / 'run.npz')
+    full = simulate.simulate(land(), 2000, 40, 0.3, seed = 7, **mode)
+    simulate.simulate(land(), 2000, 15, 0.3, seed = 7, checkpoint = path,
+                      checkpoint_every = 5, **mode)
+    resumed = simulate.simulate(land(), 2000, 40, 0.3, seed = 7,
+                                resume = path, **mode)
+
+    assert resumed.keys() == full.keys()
+    for key in full:
+        if full[key] is None:
+            assert resumed[key] is None
+        else:
+            assert numpy.array_equal(numpy.asarray(resumed[key]),
+                                     numpy.asarray(full[key])), key
+
+
+
+def close_in_thread(writer):
+    """
+    Call writer.close(), failing the test if it does not return.
+
+    Returns:
+        error -- The error raised by close(), or None.
+    """
+
+    errors = []
+
+    def close():
+        try:
+            writer.close()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target = close, daemon = True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), "close() did not return"
+
+    return errors[0] if errors else None
+
+
+
+def test_values_that_cannot_be_saved_are_rejected(tmp_path):
+    batch = rainbatch.RainBatch.random(land(), 60, 100, 1)
+    writer = checkpoint.Checkpointer(str(tmp_path / 'c.npz'))
+
+    with pytest.raises(ValueError):
+        writer.save(batch, 1, seed = None)
+    with pytest.raises(ValueError):
+        writer.save(batch, 1, seed = None)
+
+    assert close_in_thread(writer) is None
+    assert os.listdir(tmp_path) == []
+
+
+
+def test_writer_errors_are_raised(tmp_path, monkeypatch):
+    batch = rainbatch.RainBatch.random(land(), 60, 100, 1)
+    path = str(tmp_path / 'c.npz')
+
+    def fail(path, state):
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setattr(checkpoint, 'write', fail)
+    writer = checkpoint.Checkpointer(path)
+    writer.save(batch, 1)
+    writer.save(batch, 2)
+
+    error = close_in_thread(writer)
+    assert isinstance(error, RuntimeError)
+    assert not os.path.exists(path + '.tmp')
+
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    path = str(tmp_path / 'c.npz')
+    state = {'x': numpy.arange(3), 'bad': numpy.array([None, 1])}
+
+    with pytest.raises(ValueError):
+        checkpoint.write(path, state)
+
+    assert os.listdir(tmp_path) == []
+
+
+
+def test_resume_path_log(tmp_path):
+    path = str(tmp_path / 'paths.log')
+    saved = str(tmp_path / 'run.npz')
+
+    batch = rainbatch.RainBatch.random(land(), 60, 500, 2)
+    log = pathlog.BinaryPathLog(path, 60, block_size = 100)
+    for i in range(30):
+        batch.move(log)
+    full = numpy.concatenate(list(log.blocks()))
+
+    # Stop after 20 iterations, having saved the run after 12. Moves
+    # after the checkpoint are on disk, and the last ones are lost.
+    batch = rainbatch.RainBatch.random(land(), 60, 500, 2)
+    log = pathlog.BinaryPathLog(path, 60, block_size = 100)
+    for i in range(1, 21):
+        batch.move(log)
+        if i == 12:
+            checkpoint.save(saved, batch, i, visits = log)
+
+    batch = rainbatch.RainBatch.random(land(), 60, 500, 2)
+    log = pathlog.open_sink('log', 60, path, append = True)
+    step = checkpoint.restore(checkpoint.load(saved), batch, visits = log)
+    for i in range(step, 30):
+        batch.move(log)
+
+    assert numpy.array_equal(numpy.concatenate(list(log.blocks())), full)
+    assert pathlog.BinaryPathLog.open(path).num_moves == len(full)
+
+
+
+def test_open_rejects_other_files(tmp_path):
+    path = str(tmp_path / 'other.log')
+    with open(path, 'wb') as f:
+        f.write(b'not a log')
+
+    with pytest.raises(ValueError):
+        pathlog.BinaryPathLog.open(path)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 05:22:11 2026
+
+@author: agent
+
+Check the drainage network, watersheds and filled landscapes against
+raindrops traced one pixel at a time.
+
+drainage.py follows the flow-direction grid for every pixel at once.
+Here a raindrop is placed on each pixel in turn and followed through
+the grid until it reaches a sink or comes back to a pixel it has
+already visited, and the results are compared with flow_accumulation(),
+watersheds() and loops(). terrain.fill_depressions() is checked by
+tracing raindrops on the filled landscape until they reach an outlet
+point.
+
+Run with:
+
+    python -m pytest test_drainage.py
+"""
+
+import os
+import numpy
+import pytest
+import drainage
+import flowgrid
+import terrain
+
+
+
+def in_txt():
+    """
+    Read the first 100 x 100 pixels of in.txt, next to this file.
+    """
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'in.txt')
+
+    return terrain.area(terrain.load_land(path, mmap = False), 99)
+
+
+
+def tied():
+    """
+    Make a random landscape where most pixels share a height with a
+    neighbour, so raindrops move around loops.
+    """
+
+    rng = numpy.random.default_rng(11)
+
+    return rng.integers(0, 4, (41, 41)).astype(float)
+
+
+
+def rough():
+    """
+    Make a random landscape with many sinks.
+    """
+
+    rng = numpy.random.default_rng(5)
+
+    return rng.random((50, 50))
+
+
+
+@pytest.fixture(params = ['in.txt', 'tied', 'rough'])
+def land(request):
+    return {'in.txt': in_txt, 'tied': tied, 'rough': rough}[request.param]()
+
+
+
+def trace(receivers, start):
+    """
+    Follow a raindrop through the flow-direction grid one pixel at a
+    time.
+
+    Args:
+        receivers (list) -- Flow-direction grid.
+        start (int) -- Pixel the raindrop starts on.
+
+    Returns:
+        path (list) -- Pixels the raindrop is on, from 'start', each
+            once.
+        terminal (list) -- The sink, or the pixels of the loop, the
+            raindrop ends on. These are the last pixels of 'path'.
+    """
+
+    path = [start]
+    seen = {start: 0}
+    while True:
+        nxt = receivers[path[-1]]
+        if nxt == path[-1]:
+            return path, [nxt]
+        if nxt in seen:
+            return path, path[seen[nxt]:]
+        seen[nxt] = len(path)
+        path.append(nxt)
+
+
+
+def traced(land):
+    """
+    Trace a raindrop from every pixel of a landscape.
+
+    Returns:
+        acc (array) -- Flat array of the number of raindrops passing
+            through each pixel, or reaching each terminal for pixels on
+            a terminal.
+        ends (array) -- Flat array of the smallest pixel index on the
+            terminal each pixel drains into.
+        loop (array) -- Flat array, True for pixels on a loop.
+        rec (list) -- Flow-direction grid.
+    """
+
+    length = len(land) - 1
+    rec = flowgrid.receivers(land, length).tolist()
+
+    acc = numpy.zeros(len(rec))
+    ends = numpy.zeros(len(rec), dtype = numpy.intp)
+    loop = numpy.zeros(len(rec), dtype = bool)
+    reached = {}
+    members = {}
+    for start in range(len(rec)):
+        path, terminal = trace(rec, start)
+        for cell in path[:len(path) - len(terminal)]:
+            acc[cell] += 1
+        end = min(terminal)
+        reached[end] = reached.get(end, 0) + 1
+        members[end] = terminal
+        ends[start] = end
+        if len(terminal) > 1:
+            loop[terminal] = True
+
+    # Every pixel on a terminal holds the total reaching the terminal.
+    for end, total in reached.items():
+        acc[members[end]] = total
+
+    return acc, ends, loop, rec
+
+
+
+def test_flow_accumulation_matches_tracing(land):
+    length = len(land) - 1
+    acc, ends, loop, rec = traced(land)
+
+    assert numpy.array_equal(drainage.flow_accumulation(rec, length).ravel(),
+                             acc)
+    assert numpy.array_equal(drainage.network(rec, length).counts.ravel(),
+                             acc - 1)
+
+
+
+def test_watersheds_match_tracing(land):
+    length = len(land) - 1
+    acc, ends, loop, rec = traced(land)
+    labels = drainage.watersheds(rec, length).ravel()
+
+    # Pixels share a watershed exactly when they drain to the same
+    # terminal, and the watersheds are numbered from 0.
+    pairs = set(zip(labels.tolist(), ends.tolist()))
+    assert len(pairs) == len(set(labels.tolist())) == len(set(ends.tolist()))
+    assert sorted(set(labels.tolist())) == list(range(len(pairs)))
+
+
+
+def test_loops_match_tracing(land):
+    acc, ends, loop, rec = traced(land)
+
+    assert numpy.array_equal(drainage.loops(rec), loop)
+
+
+
+def test_filled_land_drains_to_outlets(land):
+    length = len(land) - 1
+    filled = terrain.fill_depressions(land, length, epsilon = True)
+    rec = flowgrid.receivers(filled, length).tolist()
+    outlet = (filled <= filled.min()).ravel()
+
+    # Filling never lowers the landscape or changes the outlet points.
+    assert (filled >= terrain.area(land, length)).all()
+    assert numpy.array_equal(outlet, (land <= land.min()).ravel())
+
+    for start in range(len(rec)):
+        cell = start
+        seen = set()
+        while not outlet[cell]:
+            assert cell not in seen, "raindrop from " + str(start) + \
+                " never reaches an outlet point"
+            seen.add(cell)
+            cell = rec[cell]
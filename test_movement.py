@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 05:01:07 2026
+
+@author: agent
+
+Check that every way of moving raindrops gives the same paths.
+
+Rain.move() without a flow-direction grid compares the 8 neighbours of
+a raindrop one at a time, as in the original model, and is taken as the
+reference. RainBatch.move(), RainBatch.advance() (flowgrid.JumpTable)
+and RainBatch.route() (multires.BlockRouter) must give exactly the same
+coordinates, counts of moves onto each pixel and counts of raindrops at
+each outlet point. Each is run on in.txt and on a small random landscape
+with few distinct heights, so many pixels are tied and raindrops move
+back and forth across flats.
+
+Run with:
+
+    python -m pytest test_movement.py
+"""
+
+import os
+import numpy
+import pytest
+import drainage
+import outlets
+import pathlog
+import rainbatch
+import rainframework
+import terrain
+
+
+NUM_OF_DROPS = 300
+STEPS = (1, 7, 64, 150)
+
+
+
+def in_txt():
+    """
+    Read in.txt, next to this file.
+    """
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'in.txt')
+
+    return terrain.area(terrain.load_land(path, mmap = False), 299)
+
+
+
+def tied():
+    """
+    Make a random landscape where most pixels share a height with a
+    neighbour.
+    """
+
+    rng = numpy.random.default_rng(11)
+
+    return rng.integers(0, 4, (41, 41)).astype(float)
+
+
+
+@pytest.fixture(params = ['in.txt', 'tied'])
+def land(request):
+    return in_txt() if request.param == 'in.txt' else tied()
+
+
+
+def rain_move(land, x, y, steps):
+    """
+    Move raindrops with Rain.move(), one pixel at a time.
+
+    Returns:
+        x (array) -- Final x-coordinates.
+        y (array) -- Final y-coordinates.
+        visits (array) -- Number of moves onto each pixel.
+    """
+
+    length = len(land) - 1
+    visits = pathlog.VisitRaster(length)
+    raindrops = []
+    for i in range(len(x)):
+        agent = rainframework.Rain(land, raindrops, visits, length, 0, 0)
+        agent.x = int(x[i])
+        agent.y = int(y[i])
+        raindrops.append(agent)
+    for j in range(steps):
+        for agent in raindrops:
+            agent.move()
+
+    return (numpy.array([agent.x for agent in raindrops]),
+            numpy.array([agent.y for agent in raindrops]), visits.counts)
+
+
+
+def positions(land, seed = 3):
+    """
+    Place the raindrops used by every test.
+    """
+
+    return rainbatch.random_positions(len(land) - 1, NUM_OF_DROPS, seed)
+
+
+
+@pytest.mark.parametrize('steps', STEPS)
+def test_batch_matches_rain(land, steps):
+    length = len(land) - 1
+    x, y = positions(land)
+    rain_x, rain_y, rain_visits = rain_move(land, x, y, steps)
+
+    stepped = rainbatch.RainBatch(land, length, x, y)
+    stepped_visits = pathlog.VisitRaster(length)
+    for j in range(steps):
+        stepped.move(stepped_visits)
+
+    jumped = rainbatch.RainBatch(land, length, x, y)
+    jumped_visits = pathlog.VisitRaster(length)
+    jumped.advance(steps, jumped_visits)
+
+    routed = rainbatch.RainBatch(land, length, x, y)
+    routed.route(steps)
+
+    for batch in (stepped, jumped, routed):
+        assert numpy.array_equal(batch.x, rain_x)
+        assert numpy.array_equal(batch.y, rain_y)
+    assert numpy.array_equal(stepped_visits.counts, rain_visits)
+    assert numpy.array_equal(jumped_visits.counts, rain_visits)
+
+
+
+@pytest.mark.parametrize('steps', STEPS)
+def test_outlets_match(land, steps):
+    length = len(land) - 1
+    x, y = positions(land, seed = 5)
+    outlet_points = outlets.Outlets(land)
+
+    stepped = rainbatch.RainBatch(land, length, x, y,
+                                  outlets = outlet_points)
+    stepped_visits = pathlog.VisitRaster(length)
+    for j in range(steps):
+        stepped.move(stepped_visits)
+
+    jumped = rainbatch.RainBatch(land, length, x, y,
+                                 outlets = outlet_points)
+    jumped_visits = pathlog.VisitRaster(length)
+    jumped.advance(steps, jumped_visits)
+
+    routed = rainbatch.RainBatch(land, length, x, y,
+                                 outlets = outlet_points)
+    routed.route(steps)
+
+    for batch in (jumped, routed):
+        assert numpy.array_equal(batch.x, stepped.x)
+        assert numpy.array_equal(batch.y, stepped.y)
+        assert numpy.array_equal(batch.outlet_counts,
+                                 stepped.outlet_counts)
+    assert numpy.array_equal(jumped_visits.counts, stepped_visits.counts)
+
+    # Every raindrop at an outlet point is counted there once.
+    stopped = outlet_points.count(stepped.x, stepped.y)
+    assert numpy.array_equal(stepped.outlet_counts, stopped)
+
+
+
+def test_advance_to_the_end(land):
+    length = len(land) - 1
+    x, y = positions(land, seed = 7)
+    outlet_points = outlets.Outlets(land)
+
+    jumped = rainbatch.RainBatch(land, length, x, y, outlets = outlet_points)
+    jumped_visits = pathlog.VisitRaster(length)
+    jumped.advance(all_drops = jumped_visits)
+    steps = jumped._jumps.end_steps
+
+    stepped = rainbatch.RainBatch(land, length, x, y,
+                                  outlets = outlet_points)
+    stepped_visits = pathlog.VisitRaster(length)
+    for j in range(steps):
+        stepped.move(stepped_visits)
+
+    routed = rainbatch.RainBatch(land, length, x, y, outlets = outlet_points)
+    routed.route()
+
+    for batch in (jumped, routed):
+        assert numpy.array_equal(batch.x, stepped.x)
+        assert numpy.array_equal(batch.y, stepped.y)
+    assert numpy.array_equal(jumped_visits.counts, stepped_visits.counts)
+
+    # Every raindrop still moving is going round a loop.
+    n = length + 1
+    cells = jumped.x[jumped.active] * n + jumped.y[jumped.active]
+    assert drainage.loops(jumped.receivers)[cells].all()
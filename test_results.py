@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 05:21:33 2026
+
+@author: agent
+
+Check the summaries of model runs kept in a results store.
+
+Run with:
+
+    python -m pytest test_results.py
+"""
+
+import numpy
+import pytest
+import results
+
+
+
+def store(path, volumes, num_of_drops = 100):
+    """
+    Make a results store holding one run for each total volume.
+    """
+
+    runs = results.ResultStore(str(path))
+    for seed, total_vol in enumerate(volumes):
+        runs.add(seed, 'abc', 10, num_of_drops, 0.3, total_vol, 1, [1.0])
+    runs.flush()
+
+    return runs
+
+
+
+def test_aggregate_without_groups(tmp_path):
+    runs = store(tmp_path, [1.0, 2.0, 6.0])
+
+    summary = runs.aggregate(by = ())
+
+    assert list(summary) == [()]
+    assert summary[()]['count'] == 3
+    assert summary[()]['mean'] == pytest.approx(3.0)
+    assert summary[()]['min'] == 1.0
+    assert summary[()]['max'] == 6.0
+
+
+
+def test_aggregate_std_of_large_values(tmp_path):
+    volumes = 1e9 + numpy.array([0.1, 0.2, 0.3, 0.4])
+    runs = store(tmp_path, volumes)
+
+    summary = runs.aggregate(by = ('num_of_drops',))
+
+    assert summary[(100,)]['std'] == pytest.approx(numpy.std(volumes),
+                                                   rel = 1e-6)
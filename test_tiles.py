@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 05:18:46 2026
+
+@author: agent
+
+Check that raindrops moved on a landscape stored as tiles follow the
+same paths as on the whole landscape.
+
+in.txt is split into tiles smaller than the landscape, so raindrops
+cross between tiles. The outlet points found a tile at a time and the
+coordinates and outlet counts from TiledRainBatch.move() must match
+those from outlets.Outlets() and RainBatch.move().
+
+Run with:
+
+    python -m pytest test_tiles.py
+"""
+
+import os
+import numpy
+import pytest
+import outlets
+import rainbatch
+import terrain
+import tiles
+
+
+NUM_OF_DROPS = 5000
+NUM_OF_STEPS = 400
+
+
+
+def in_txt():
+    """
+    Read in.txt, next to this file.
+    """
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'in.txt')
+
+    return terrain.area(terrain.load_land(path, mmap = False), 299)
+
+
+
+@pytest.mark.parametrize('tile_size', [64, 100])
+def test_tiles_match_batch(tmp_path, tile_size):
+    land = in_txt()
+    length = len(land) - 1
+    tiles.write_tiles(land, str(tmp_path), tile_size = tile_size)
+    tiled_land = tiles.TiledLand(str(tmp_path))
+
+    outlet_points = outlets.Outlets(land)
+    min_elev, outlet_x, outlet_y = tiled_land.outlets()
+    assert min_elev == land.min()
+    assert numpy.array_equal(outlet_x, outlet_points.x)
+    assert numpy.array_equal(outlet_y, outlet_points.y)
+
+    x, y = rainbatch.random_positions(length, NUM_OF_DROPS, 2)
+    batch = rainbatch.RainBatch(land, length, x, y, outlets = outlet_points)
+    tiled = tiles.TiledRainBatch(tiled_land, x, y, outlet_x, outlet_y)
+    for j in range(NUM_OF_STEPS):
+        batch.move()
+        tiled.move()
+
+    assert numpy.array_equal(tiled.x, batch.x)
+    assert numpy.array_equal(tiled.y, batch.y)
+    assert numpy.array_equal(tiled.outlet_counts, batch.outlet_counts)
+    assert numpy.array_equal(numpy.sort(tiled.active),
+                             numpy.sort(batch.active))
+
+
+
+def test_outlet_coordinates_come_in_pairs(tmp_path):
+    tiles.write_tiles(numpy.zeros((10, 10)), str(tmp_path), tile_size = 4)
+    tiled_land = tiles.TiledLand(str(tmp_path))
+
+    with pytest.raises(ValueError):
+        tiles.TiledRainBatch(tiled_land, [1], [1], outlet_x = [0])
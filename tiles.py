@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 04:29:27 2026
+
+@author: agent
+
+Use landscapes that are too large to hold in memory.
+
+The landscape is split into square tiles of a fixed size, each saved in
+its own .npy file together with a border (halo) of the pixels around
+it. Only a limited number of tiles are kept in memory at once; the
+least recently used tile is dropped when another is needed. Because of
+the halo, all 8 neighbours of any pixel are found in the same tile as
+the pixel itself, so raindrops on the edge of a tile can be moved
+without loading the tiles next to it.
+
+A TiledLand can be indexed as land[x][y], like the nested lists, so it
+can be used with Rain agents. TiledRainBatch moves many raindrops at
+once, grouping them by tile so each tile is looked at once per step, and
+stops raindrops that reach an outlet point, like rainbatch.RainBatch.
+The outlet points are found with TiledLand.outlets(), a tile at a time.
+Both are used directly rather than from simulate.py or project.py, which
+hold the whole landscape in memory.
+"""
+
+import collections
+import json
+import os
+import numpy
+import flowgrid
+
+
+# Name of the file describing the tiles in a tile directory.
+META = 'tiles.json'
+
+
+
+def tile_path(path, i, j):
+    """
+    Get the name of the file holding a tile.
+
+    Args:
+        path (str) -- Tile directory.
+        i (int) -- Tile row.
+        j (int) -- Tile column.
+
+    Returns:
+        The name of the .npy file.
+    """
+
+    return os.path.join(path, 'tile_' + str(i) + '_' + str(j) + '.npy')
+
+
+
+def write_tiles(land, path, tile_size = 1024, halo = 1):
+    """
+    Split a landscape into tiles and save them in a directory.
+
+    One tile is read and written at a time, so a memory-mapped landscape
+    (see terrain.load_land()) larger than the available memory can be
+    split.
+
+    Args:
+        land (array) -- Environment elevations, indexed land[x][y].
+        path (str) -- Directory to write the tiles to.
+        tile_size (int) -- Number of pixels along each side of a tile.
+        halo (int) -- Number of pixels around each tile also saved with
+            it, at least 1. Pixels outside the environment are given an
+            infinite elevation.
+    """
+
+    if halo < 1:
+        raise ValueError("Tiles need a halo of at least 1 pixel to find "
+                         "where raindrops move on their edges.")
+
+    land = numpy.asarray(land)
+    rows, cols = land.shape
+    os.makedirs(path, exist_ok = True)
+
+    for i in range(0, (rows + tile_size - 1) // tile_size):
+        for j in range(0, (cols + tile_size - 1) // tile_size):
+            tile = numpy.full((tile_size + 2 * halo, tile_size + 2 * halo),
+                              numpy.inf)
+            x0 = i * tile_size - halo
+            y0 = j * tile_size - halo
+            x1 = min(x0 + tile_size + 2 * halo, rows)
+            y1 = min(y0 + tile_size + 2 * halo, cols)
+            tile[max(-x0, 0):x1 - x0, max(-y0, 0):y1 - y0] = \
+                land[max(x0, 0):x1, max(y0, 0):y1]
+            numpy.save(tile_path(path, i, j), tile)
+
+    with open(os.path.join(path, META), 'w') as f:
+        json.dump({'rows': rows, 'cols': cols, 'tile_size': tile_size,
+                   'halo': halo}, f)
+
+
+
+class TiledLand():
+    """
+    Set up and provide methods for a landscape stored as tiles.
+
+    __init__ -- Read the description of the tiles.
+    tile -- Get the elevations of a tile, including its halo.
+    directions -- Get the directions raindrops move in on a tile.
+    outlets -- Find the minimum elevation and the outlet points.
+    __getitem__ -- Get the elevation of a pixel, as land[x][y].
+    __len__ -- Get the number of rows.
+    """
+
+    def __init__(self, path, cache_size = 64):
+        """
+        Read the description of the tiles.
+
+        Args:
+            path (str) -- Tile directory written by write_tiles().
+            cache_size (int) -- Number of tiles kept in memory. The
+                directions found for up to the same number of tiles are
+                kept as well.
+        """
+
+        with open(os.path.join(path, META)) as f:
+            meta = json.load(f)
+
+        self.path = path
+        self.rows = meta['rows']
+        self.cols = meta['cols']
+        self.shape = (self.rows, self.cols)
+        self.tile_size = meta['tile_size']
+        self.halo = meta['halo']
+        self.cache_size = cache_size
+
+        if self.halo < 1:
+            raise ValueError(path + " has tiles without a halo.")
+
+        # Tiles and their directions in memory, from least to most
+        # recently used. They are kept apart so the directions never
+        # push the tiles they were found from out of memory.
+        self._tiles = collections.OrderedDict()
+        self._directions = collections.OrderedDict()
+
+        # Number of tiles read from disk, to check the cache is working.
+        self.loads = 0
+
+
+    def _cached(self, cache, key, make):
+        """
+        Get an item from a cache, making it if it is not there.
+
+        Args:
+            cache (OrderedDict) -- Cache to look in.
+            key (tuple) -- Key of the item.
+            make (function) -- Makes the item if it is not cached.
+
+        Returns:
+            The item.
+        """
+
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        item = make()
+        cache[key] = item
+        if len(cache) > self.cache_size:
+            cache.popitem(last = False)
+
+        return item
+
+
+    def tile(self, i, j):
+        """
+        Get the elevations of a tile, including its halo.
+
+        Args:
+            i (int) -- Tile row.
+            j (int) -- Tile column.
+
+        Returns:
+            tile (array) -- Elevations. Pixel (x, y) of the landscape is
+                at [x - i * tile_size + halo, y - j * tile_size + halo].
+        """
+
+        def load():
+            self.loads = self.loads + 1
+            return numpy.load(tile_path(self.path, i, j))
+
+        return self._cached(self._tiles, (i, j), load)
+
+
+    def directions(self, i, j):
+        """
+        Get the directions raindrops move in on a tile.
+
+        Found with flowgrid.directions() using the halo, so they are the
+        same as for the whole landscape.
+
+        Args:
+            i (int) -- Tile row.
+            j (int) -- Tile column.
+
+        Returns:
+            dx (array) -- Change in x-coordinate for each pixel of the
+                tile (without its halo).
+            dy (array) -- Change in y-coordinate for each pixel.
+        """
+
+        def make():
+            tile = self.tile(i, j)
+            h = self.halo - 1
+            padded = tile[h:tile.shape[0] - h, h:tile.shape[1] - h]
+            dx, dy = flowgrid.directions(padded)
+            return dx.astype(numpy.int8), dy.astype(numpy.int8)
+
+        return self._cached(self._directions, (i, j), make)
+
+
+    def outlets(self):
+        """
+        Find the minimum elevation and the outlet points.
+
+        The tiles are read one at a time, so only the outlet points are
+        kept in memory. They are the same as those found by
+        outlets.Outlets() for the whole landscape.
+
+        Returns:
+            min_elev (float) -- Minimum elevation.
+            outlet_x (array) -- Outlet point x-coordinates, in the same
+                order as outlets.Outlets().
+            outlet_y (array) -- Outlet point y-coordinates.
+        """
+
+        size = self.tile_size
+        h = self.halo
+        min_elev = numpy.inf
+        found_x = []
+        found_y = []
+        for i in range(0, (self.rows + size - 1) // size):
+            for j in range(0, (self.cols + size - 1) // size):
+                # Pixels outside the landscape have an infinite
+                # elevation, so are never the lowest.
+                inner = self.tile(i, j)[h:h + size, h:h + size]
+                low = inner.min()
+                if low > min_elev:
+                    continue
+                if low < min_elev:
+                    min_elev = low
+                    found_x = []
+                    found_y = []
+                lx, ly = numpy.nonzero(inner <= min_elev)
+                found_x.append(lx + i * size)
+                found_y.append(ly + j * size)
+
+        outlet_x = numpy.concatenate(found_x).astype(numpy.intp)
+        outlet_y = numpy.concatenate(found_y).astype(numpy.intp)
+        order = numpy.lexsort((outlet_y, outlet_x))
+
+        return float(min_elev), outlet_x[order], outlet_y[order]
+
+
+    def __getitem__(self, key):
+        """
+        Get the elevation of a pixel, as land[x][y] or land[x, y].
+
+        Args:
+            key -- Row x, or a tuple (x, y).
+
+        Returns:
+            The elevation, or a row that can be indexed with y.
+        """
+
+        if isinstance(key, tuple):
+            x, y = key
+            if not (0 <= x < self.rows and 0 <= y < self.cols):
+                raise IndexError("Pixel (" + str(x) + ", " + str(y) +
+                                 ") is outside the landscape.")
+            i, lx = divmod(x, self.tile_size)
+            j, ly = divmod(y, self.tile_size)
+            return float(self.tile(i, j)[lx + self.halo, ly + self.halo])
+
+        return _Row(self, key)
+
+
+    def __len__(self):
+        """
+        Get the number of rows.
+        """
+
+        return self.rows
+
+
+
+class _Row():
+    """
+    A row of a TiledLand, so pixels can be indexed as land[x][y].
+    """
+
+    __slots__ = ('land', 'x')
+
+    def __init__(self, land, x):
+        """
+        Set up the row.
+
+        Args:
+            land (TiledLand) -- Landscape stored as tiles.
+            x (int) -- Row.
+        """
+
+        self.land = land
+        self.x = x
+
+
+    def __getitem__(self, y):
+        """
+        Get the elevation of the pixel in column y of the row.
+        """
+
+        return self.land[self.x, y]
+
+
+    def __len__(self):
+        """
+        Get the number of columns.
+        """
+
+        return self.land.cols
+
+
+
+class TiledRainBatch():
+    """
+    Set up and provide methods for a batch of raindrops on a TiledLand.
+
+    Works like rainbatch.RainBatch, but finds where raindrops move from
+    the tiles rather than a flow-direction grid for the whole landscape.
+
+    __init__ -- Set up batch coordinates.
+    num_active -- Get the number of raindrops that are still moving.
+    move -- Move all raindrops downslope by one step.
+    """
+
+    def __init__(self, land, x, y, outlet_x = None, outlet_y = None):
+        """
+        Set up batch coordinates.
+
+        Args:
+            land (TiledLand) -- Landscape stored as tiles.
+            x (list) -- Raindrop x-coordinates.
+            y (list) -- Raindrop y-coordinates.
+            outlet_x (array) -- Optional outlet point x-coordinates,
+                e.g. from TiledLand.outlets(). Raindrops that reach an
+                outlet point stop moving and are counted in
+                self.outlet_counts, in the same order.
+            outlet_y (array) -- Outlet point y-coordinates.
+        """
+
+        if (outlet_x is None) != (outlet_y is None):
+            raise ValueError("Give both the x- and y-coordinates of the "
+                             "outlet points.")
+
+        self.land = land
+        self.x = numpy.array(x, dtype = numpy.intp)
+        self.y = numpy.array(y, dtype = numpy.intp)
+        self.has_outlets = outlet_x is not None
+
+        # Indices of the raindrops that are still moving.
+        self.active = numpy.arange(len(self.x))
+
+        if self.has_outlets:
+            # Pixels of the outlet points in order, so the outlet under a
+            # raindrop is found with a binary search. No grid the size of
+            # the landscape is needed.
+            cells = numpy.asarray(outlet_x, dtype = numpy.int64) * \
+                land.cols + numpy.asarray(outlet_y, dtype = numpy.int64)
+            self._outlet_order = numpy.argsort(cells)
+            self._outlet_cells = cells[self._outlet_order]
+
+            # Number of raindrops that have stopped at each outlet point.
+            self.outlet_counts = numpy.zeros(len(cells), dtype = numpy.intp)
+            self._retire()
+
+
+    def _retire(self):
+        """
+        Stop moving raindrops that have reached an outlet point.
+
+        Each raindrop is counted at its outlet point once, when it stops.
+        """
+
+        if len(self._outlet_cells) == 0:
+            return
+
+        cells = self.x[self.active].astype(numpy.int64) * self.land.cols + \
+            self.y[self.active]
+        i = numpy.searchsorted(self._outlet_cells, cells)
+        i = numpy.minimum(i, len(self._outlet_cells) - 1)
+        at_outlet = self._outlet_cells[i] == cells
+        self.outlet_counts += numpy.bincount(
+            self._outlet_order[i[at_outlet]],
+            minlength = len(self.outlet_counts))
+        self.active = self.active[~at_outlet]
+
+
+    @property
+    def num_active(self):
+        """
+        Get the number of raindrops that are still moving.
+
+        Returns:
+            The number of raindrops that are still moving.
+        """
+
+        return len(self.active)
+
+
+    def move(self, all_drops = None):
+        """
+        Move all raindrops downslope by one step.
+
+        Raindrops are sorted by tile, and the directions for each tile
+        are looked up once for all the raindrops on it. Raindrops that do
+        not move are on a sink and are removed from the set of moving
+        raindrops.
+
+        Args:
+            all_drops (list) -- Optional list of all raindrop coordinates,
+                or a pathlog.VisitRaster, as in RainBatch.move().
+
+        Returns:
+            moved (array) -- Indices of the raindrops that moved.
+        """
+
+        size = self.land.tile_size
+        x = self.x[self.active]
+        y = self.y[self.active]
+        ti, lx = numpy.divmod(x, size)
+        tj, ly = numpy.divmod(y, size)
+
+        # Group the raindrops by tile.
+        tile_ids = ti * ((self.land.cols + size - 1) // size) + tj
+        order = numpy.argsort(tile_ids, kind = 'stable')
+        starts = numpy.flatnonzero(numpy.diff(tile_ids[order],
+                                              prepend = -1))
+        ends = numpy.append(starts[1:], len(order))
+
+        step_x = numpy.zeros(len(x), dtype = numpy.intp)
+        step_y = numpy.zeros(len(y), dtype = numpy.intp)
+        for start, end in zip(starts, ends):
+            group = order[start:end]
+            dx, dy = self.land.directions(int(ti[group[0]]),
+                                          int(tj[group[0]]))
+            step_x[group] = dx[lx[group], ly[group]]
+            step_y[group] = dy[lx[group], ly[group]]
+
+        moves = (step_x != 0) | (step_y != 0)
+        moved = self.active[moves]
+        self.x[moved] += step_x[moves]
+        self.y[moved] += step_y[moves]
+        self.active = moved
+
+        if self.has_outlets:
+            self._retire()
+
+        if all_drops is None:
+            pass
+        elif hasattr(all_drops, 'record'):
+            all_drops.record(self.x[moved], self.y[moved])
+        else:
+            all_drops.extend(zip(self.y[moved].tolist(),
+                                 self.x[moved].tolist()))
+
+        return moved